@@ -0,0 +1,358 @@
+"""
+Benchmark of the solvers on generated cohorts (see generate.py).
+
+    python backend/benchmark.py --sizes 100x20,400x80 --time-limit 30 --output bench.json
+
+Every (cohort, solver) pair runs in a fresh process started in the cohort
+directory and records
+
+    load_time       reading the CSV files into a Dataset (seconds)
+    build_time      building the CP-SAT model
+    presolve_time   CP-SAT presolve
+    first_solution  seconds from the start (load included) to the first solution
+    proven_time     seconds from the start to the proof of optimality, null when
+                    the time limit came first
+    trace           [seconds, objective, min team goodness] of every improving solution
+    peak_memory_mb  maximum resident memory of the process
+
+Every solution is scored with the solver2 objective, so the solvers can be
+compared with each other. Times that do not apply to a solver are null.
+The output file is json, keep one per commit to compare them.
+
+solvers:
+    heuristic   heuristic.py alone
+    solver2     one CP-SAT model for the cohort (monolithic, no heuristic hint)
+    compressed  the same with identical students as classes (compress.py)
+    lexicographic
+                solver2 with the lexicographic objective, min goodness first
+    decompose   the decomposition mode of solver2 (decompose.py)
+    solver      the original solver.py, run on the same cohort without the
+                time slot columns (it ignores them), with its own group sizes
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from importlib import metadata
+import numpy as np
+import generate
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SOLVERS = ["heuristic", "solver2", "compressed", "lexicographic", "decompose", "solver"]
+
+
+def peak_memory_mb(who=None):
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on linux
+    return resource.getrusage(who if who is not None else resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def scorer(data, started, trace):
+    """publish() for solver2.solve style solvers, appends to trace"""
+    import solver2
+
+    def publish(matching, time_slot=None):
+        x = np.zeros((data.n_students, data.n_teams), dtype=int)
+        for t, members in matching.items():
+            x[members, int(t)] = 1
+        goodness = solver2.team_goodness_values(data, x)
+        trace.append([
+            time.perf_counter() - started,
+            solver2.objective_value(data, x),
+            int(goodness.min()),
+        ])
+
+    return publish
+
+
+def run_heuristic(data, options, time_limit, started, result):
+    import heuristic
+
+    solution = heuristic.solve(data, options["heuristic_time"])
+    if solution is None:
+        result["status"] = "INFEASIBLE"
+        return
+    x, slots = solution
+    scorer(data, started, result["trace"])(
+        {t: np.flatnonzero(x[:, t]).tolist() for t in range(data.n_teams)}
+    )
+    result["status"] = "FEASIBLE"
+
+
+def run_solver2(data, options, time_limit, started, result, compressed=False, objective="weighted"):
+    import solver2
+    import compress
+    from ortools.sat.python import cp_model
+
+    built = time.perf_counter()
+    if compressed:
+        team_model = compress.CompressedModel(data, options)
+        result["classes"] = len(team_model.members)
+    else:
+        team_model = solver2.TeamModel(data, options)
+    result["build_time"] = time.perf_counter() - built
+    result["variables"] = len(team_model.model.Proto().variables)
+
+    solver = cp_model.CpSolver()
+    solver2.apply_profile(solver, options["profile"])
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = options["num_workers"] or max(os.cpu_count() - 1, 1)
+    solver.parameters.log_search_progress = True
+    solver.parameters.log_to_stdout = False
+
+    solve_started = time.perf_counter()
+
+    def log(line):
+        # the presolved model is logged once presolve is done
+        if result["presolve_time"] is None and line.startswith("Presolved"):
+            result["presolve_time"] = time.perf_counter() - solve_started
+
+    solver.log_callback = log
+
+    class Trace(solver2.TeamFormationCallback):
+        def on_solution_callback(self):
+            result["trace"].append([
+                time.perf_counter() - started,
+                self.weighted_objective(),
+                self.Value(team_model.min_goodness) * team_model.scale,
+            ])
+
+    if objective == "lexicographic":
+        # half of the time limit for each phase
+        result["status"] = solver2.solve_lexicographic(
+            team_model, solver, Trace(team_model, None),
+            {**options, "min_time": time_limit / 2, "total_time": time_limit / 2},
+        )
+    else:
+        result["status"] = solver.StatusName(solver.Solve(team_model.model, Trace(team_model, None)))
+    if result["status"] == "OPTIMAL":
+        result["proven_time"] = time.perf_counter() - started
+
+
+def run_compressed(data, options, time_limit, started, result):
+    run_solver2(data, options, time_limit, started, result, compressed=True)
+
+
+def run_lexicographic(data, options, time_limit, started, result):
+    run_solver2(data, options, time_limit, started, result, objective="lexicographic")
+
+
+def run_decompose(data, options, time_limit, started, result):
+    import decompose
+
+    cancelled = threading.Event()
+    timer = threading.Timer(time_limit, cancelled.set)
+    timer.start()
+    try:
+        result["status"] = decompose.solve(
+            data, options, scorer(data, started, result["trace"]), cancelled=cancelled
+        )
+    finally:
+        timer.cancel()
+    if result["status"] == "CANCELLED":
+        result["status"] = "TIME_LIMIT"
+    if resource is not None:
+        # the pieces are solved in a process pool
+        result["peak_memory_mb"] = max(peak_memory_mb(), peak_memory_mb(resource.RUSAGE_CHILDREN))
+
+
+def run_solver(data, options, time_limit, started, result):
+    import pandas as pd
+    import solver2
+
+    # solver.py reads files/ of its working directory and does not know
+    # about time slot columns
+    os.makedirs("legacy/files", exist_ok=True)
+    pd.read_csv("files/Company.csv").to_csv("legacy/files/Company.csv", index=False)
+    pd.read_csv("files/Student.csv").drop(columns=solver2.AVA_LST).to_csv(
+        "legacy/files/Student.csv", index=False
+    )
+
+    proc = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(BACKEND_DIR, "solver.py")],
+        cwd="legacy", stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    publish = scorer(data, started, result["trace"])
+    matching = {}
+
+    def read():
+        for line in proc.stdout:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("type") == "delta":
+                matching.update(record["matching"])
+                publish(matching)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    reader.join(time_limit)
+
+    # the stream ends when solver.py exits, still open means it is solving
+    timed_out = reader.is_alive()
+    if timed_out:
+        proc.kill()
+    if hasattr(os, "wait4"):
+        # wait4 also reports the peak memory of this one child
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        result["peak_memory_mb"] = usage.ru_maxrss / 1024
+    else:
+        proc.wait()
+    reader.join()
+    result["status"] = "TIME_LIMIT" if timed_out else f"EXIT_{proc.returncode}"
+
+
+RUNNERS = {
+    "heuristic": run_heuristic,
+    "solver2": run_solver2,
+    "compressed": run_compressed,
+    "lexicographic": run_lexicographic,
+    "decompose": run_decompose,
+    "solver": run_solver,
+}
+
+
+def run_case(directory, name, options, time_limit, results):
+    # runs in its own process: the config of the cohort is read on import
+    os.chdir(directory)
+    sys.stdout = open(os.devnull, "w")
+    import solver2
+
+    result = {
+        "solver": name, "status": None, "load_time": None, "build_time": None,
+        "presolve_time": None, "first_solution": None, "proven_time": None, "trace": [],
+        "peak_memory_mb": None,
+    }
+    try:
+        started = time.perf_counter()
+        data = solver2.load_data()
+        result["load_time"] = time.perf_counter() - started
+
+        options = {**solver2.DEFAULT_OPTIONS, **options}
+        RUNNERS[name](data, options, time_limit, started, result)
+    except Exception as e:
+        result.update(status="ERROR", msg=str(e))
+
+    if result["trace"]:
+        result["first_solution"] = result["trace"][0][0]
+    if result["peak_memory_mb"] is None:
+        result["peak_memory_mb"] = peak_memory_mb()
+    results.put(result)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_sizes(text):
+    """'100x20,400x80' -> [(100, 20), (400, 80)]"""
+    return [tuple(int(n) for n in size.split("x")) for size in text.split(",")]
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=parse_sizes, default=parse_sizes("100x20,400x80"),
+        help="cohorts as students x projects, comma separated",
+    )
+    parser.add_argument("--solvers", default="heuristic,solver2,decompose")
+    parser.add_argument("--time-limit", type=float, default=30, help="seconds per run")
+    parser.add_argument("--num-workers", type=int, default=None, help="CP-SAT search workers")
+    parser.add_argument("--output", default="benchmark.json")
+    generate.add_arguments(parser)
+    args = parser.parse_args()
+
+    solvers = args.solvers.split(",")
+    unknown = [s for s in solvers if s not in RUNNERS]
+    if unknown:
+        parser.error(f"unknown solvers {unknown}, choose from {SOLVERS}")
+
+    generator = {
+        "skills": args.skills, "slots": args.slots, "student_ratings": args.student_ratings,
+        "company_ratings": args.company_ratings, "availability": args.availability,
+        "seed": args.seed,
+    }
+    report = {
+        "commit": git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "ortools": metadata.version("ortools"),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {"time_limit": args.time_limit, "num_workers": args.num_workers, **generator},
+        "runs": [],
+    }
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'cohort':>10} {'solver':>13} {'status':>12} {'build':>6} {'presolve':>8} "
+          f"{'first':>6} {'proven':>6} {'min goodness':>12} {'MB':>6}")
+
+    for n_students, n_projects in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="benchmark_") as directory:
+            generate.write_cohort(directory, *generate.generate(
+                n_students, n_projects, args.skills, args.slots, args.student_ratings,
+                args.company_ratings, args.availability, args.seed,
+            ))
+
+            for name in solvers:
+                results = context.Queue()
+                proc = context.Process(
+                    target=run_case,
+                    args=(directory, name, {"num_workers": args.num_workers, "heuristic": False},
+                          args.time_limit, results),
+                )
+                proc.start()
+                try:
+                    # generous for imports, loading and stopping
+                    result = results.get(timeout=args.time_limit * 2 + 120)
+                except queue.Empty:
+                    result = {"solver": name, "status": "NO_RESULT", "trace": []}
+                    proc.kill()
+                proc.join()
+
+                result.update(students=n_students, projects=n_projects)
+                report["runs"].append(result)
+
+                # the solver objective of solver.py is not the one of the trace
+                best = max(result["trace"], key=lambda p: p[1])[2] if result["trace"] else None
+                print(
+                    f"{f'{n_students}x{n_projects}':>10} {name:>13} {result['status']:>12} "
+                    f"{format_seconds(result.get('build_time')):>6} "
+                    f"{format_seconds(result.get('presolve_time')):>8} "
+                    f"{format_seconds(result.get('first_solution')):>6} "
+                    f"{format_seconds(result.get('proven_time')):>6} "
+                    f"{'-' if best is None else best:>12} "
+                    f"{format_seconds(result.get('peak_memory_mb')):>6}",
+                    flush=True,
+                )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
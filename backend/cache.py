@@ -0,0 +1,191 @@
+"""
+On-disk cache of solver results, keyed by what the result depends on: the
+content (sha256) of Company.csv and Student.csv, the config.json sections used by the
+model, the solve options that shape the result (layout, formulation, mode,
+objective, profile) and the solver version (OR-Tools version and the solver
+sources).
+
+files/cache/<key>/ holds a copy of out.json and out.csv and meta.json with
+the final record of the solve ({"type": "done", "status": ...}) and the
+last time the entry was used. The least recently used entries are removed
+when the cache grows over cache.max_bytes (config.json).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from importlib import metadata
+import ingest
+import writer
+
+CONFIG_FILE = "config.json"
+CACHE_DIR = "files/cache/"
+
+# the config sections read by the solver, the others (notes, verifier, cache)
+# do not change the result
+CONFIG_SECTIONS = [
+    "student_mapping",
+    "company_mapping",
+    "skill_importance",
+    "time_avaliability",
+    "group_size",
+]
+# the sources that make or write out.json and out.csv
+SOLVER_FILES = [
+    "backend/solver2.py", "backend/heuristic.py", "backend/decompose.py", "backend/compress.py",
+    "backend/ingest.py", "backend/reoptimize.py", "backend/stream.py", "backend/writer.py",
+]
+RESULT_FILES = ["out.json", "out.csv"]
+# the solve options that shape the result, with the defaults of
+# solver2.DEFAULT_OPTIONS. The stop rules and the search sizes only decide
+# how far a solve got, that is the status of the entry
+RESULT_OPTIONS = {
+    "availability": "aggregated",
+    "mode": "monolithic",
+    "compress": "auto",
+    "objective": "weighted",
+    "payload": "rows",
+    "profile": None,
+}
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def solver_version():
+    digest = hashlib.sha256(metadata.version("ortools").encode("utf-8"))
+    for path in SOLVER_FILES:
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def config_digest():
+    """sha256 of the config.json sections the solver reads"""
+    with open(CONFIG_FILE) as f:
+        config = json.load(f)
+    return hashlib.sha256(json.dumps(
+        {k: config.get(k) for k in CONFIG_SECTIONS}, sort_keys=True
+    ).encode("utf-8")).hexdigest()
+
+
+def file_digests(comp_path, stud_path):
+    # hashed once per file version, usually already by the verification
+    return [ingest.file_digest(path) for path in (comp_path, stud_path)]
+
+
+def result_options(options):
+    """the RESULT_OPTIONS of a solve, the profile as its CP-SAT parameters"""
+    result = {
+        k: default if options.get(k) is None else options[k]
+        for k, default in RESULT_OPTIONS.items()
+    }
+    with open(CONFIG_FILE) as f:
+        section = json.load(f).get("solver", {})
+    name = result["profile"] or section.get("profile", "default")
+    result["profile"] = section.get("profiles", {}).get(name)
+    return result
+
+
+def input_key(digests, config, options):
+    """
+    the key of the result of the files with these digests (file_digests),
+    solved with the config of this config_digest() and these solve options
+    """
+    digest = hashlib.sha256()
+    for file in digests:
+        digest.update(file.encode("utf-8"))
+    digest.update(config.encode("utf-8"))
+    digest.update(json.dumps(result_options(options), sort_keys=True).encode("utf-8"))
+    digest.update(solver_version().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def copy_file(src, dst):
+    # through a temp file, readers of dst never see a half copied file
+    directory = os.path.dirname(dst) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(dst))
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class ResultCache:
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=None):
+        if max_bytes is None:
+            with open(CONFIG_FILE) as f:
+                max_bytes = json.load(f).get("cache", {}).get("max_bytes", DEFAULT_MAX_BYTES)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def entry_path(self, key, name=""):
+        return os.path.join(self.directory, key, name)
+
+    def get(self, key):
+        """the meta data of the entry (marked as used), None on a miss"""
+        try:
+            with open(self.entry_path(key, "meta.json")) as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        meta["used"] = time.time()
+        writer.atomic_write(self.entry_path(key, "meta.json"), lambda file: json.dump(meta, file))
+        return meta
+
+    def restore(self, key, workspace):
+        # the cached result files become the result of the workspace
+        for name in RESULT_FILES:
+            copy_file(self.entry_path(key, name), os.path.join(workspace, name))
+
+    def put(self, key, workspace, result):
+        """stores the result files of a workspace, result is the final solver record"""
+        if not all(os.path.exists(os.path.join(workspace, name)) for name in RESULT_FILES):
+            return
+
+        # built next to the entry and renamed into place
+        tmp_dir = tempfile.mkdtemp(dir=self.directory, prefix=".tmp_")
+        try:
+            for name in RESULT_FILES:
+                shutil.copyfile(os.path.join(workspace, name), os.path.join(tmp_dir, name))
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as file:
+                json.dump({"result": result, "created": time.time(), "used": time.time()}, file)
+
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            os.replace(tmp_dir, self.entry_path(key))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for key in os.listdir(self.directory):
+            if key.startswith("."):
+                continue
+            try:
+                with open(self.entry_path(key, "meta.json")) as file:
+                    used = json.load(file)["used"]
+            except (OSError, ValueError, KeyError):
+                used = 0
+            size = sum(
+                os.path.getsize(os.path.join(self.entry_path(key), name))
+                for name in os.listdir(self.entry_path(key))
+            )
+            entries.append((used, size, key))
+
+        total = sum(size for _, size, _ in entries)
+        for used, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total -= size
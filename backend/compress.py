@@ -0,0 +1,137 @@
+"""
+Compressed formulation of solver2 for cohorts with identical students.
+
+Students with the same ratings and the same availability are
+interchangeable, so they are grouped into classes and the model decides
+how many students of each class join each team (one integer count per
+class and team) instead of one boolean per student and team. Projects with
+identical requirements are interchangeable too, their team goodness is
+ordered to cut the symmetric solutions. A solution is expanded back into
+per-student assignments by handing out the members of every class in
+order.
+
+CompressedModel has the same interface as solver2.TeamModel (model,
+time_slot, team_goodness, min_goodness, scale, solution()), the objective and the
+constraints are the same, availability always in the aggregated form.
+"""
+import numpy as np
+from ortools.sat.python import cp_model
+import solver2
+
+
+def student_classes(data):
+    """class index of every student and the students of every class"""
+    keys = np.hstack([data.np_students, data.np_available])
+    _, labels = np.unique(keys, axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    order = np.argsort(labels, kind="stable")
+    members = np.split(order, np.flatnonzero(np.diff(labels[order])) + 1)
+    return labels, members
+
+
+def identical_teams(data):
+    """groups (of 2 or more) of teams with the same coefficients"""
+    _, labels = np.unique(data.coefficients, axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    groups = [np.flatnonzero(labels == g) for g in range(labels.max() + 1)]
+    return [g for g in groups if len(g) > 1]
+
+
+def worth_compressing(data):
+    # only when some students share a class, otherwise it is the same model
+    return len(student_classes(data)[1]) < data.n_students
+
+
+class CompressedModel:
+
+    def __init__(self, data, options):
+        self.labels, self.members = student_classes(data)
+        n_classes, n_teams = len(self.members), data.n_teams
+        sizes = np.array([len(m) for m in self.members])
+        first = np.array([m[0] for m in self.members])
+        class_skills = data.np_students[first]
+        class_available = data.np_available[first]
+
+        model = self.model = cp_model.CpModel()
+
+        # count[c, t] students of class c in team t
+        count = self.count = np.empty((n_classes, n_teams), dtype=object)
+        for c in range(n_classes):
+            upper = int(min(sizes[c], solver2.GRP_SIZ["max"]))
+            for t in range(n_teams):
+                count[c, t] = model.NewIntVar(0, upper, f"count_c{c}_t{t}")
+
+        time_slot = self.time_slot = np.empty((n_teams, len(solver2.AVA_LST)), dtype=object)
+        for t in range(n_teams):
+            for j, time in enumerate(solver2.AVA_LST):
+                time_slot[t, j] = model.NewBoolVar(f"slot_t{t}_time{time}")
+            model.AddExactlyOne(time_slot[t, :])
+
+        # the aggregated availability formulation, over classes
+        for j in range(len(solver2.AVA_LST)):
+            unavailable = np.flatnonzero(class_available[:, j] == 0)
+            if len(unavailable) == 0:
+                continue
+            for t in range(n_teams):
+                model.Add(cp_model.LinearExpr.Sum(list(count[unavailable, t])) == 0).OnlyEnforceIf(
+                    time_slot[t, j]
+                )
+
+        for c in range(n_classes):
+            model.Add(cp_model.LinearExpr.Sum(list(count[c, :])) == int(sizes[c]))
+
+        for t in range(n_teams):
+            team_size = cp_model.LinearExpr.Sum(list(count[:, t]))
+            model.Add(team_size >= solver2.GRP_SIZ["min"])
+            model.Add(team_size <= solver2.GRP_SIZ["max"])
+
+        self.scale, lower, upper = solver2.goodness_bounds(data)
+
+        team_goodness = self.team_goodness = np.empty(n_teams, dtype=object)
+        for t in range(n_teams):
+            team_goodness[t] = model.NewIntVar(int(lower[t]), int(upper[t]), f"team_goodness_{t}")
+            skill_sums = [
+                cp_model.LinearExpr.WeightedSum(
+                    list(count[:, t]),
+                    (class_skills[:, k] * data.coefficients[t, k] // self.scale).tolist(),
+                )
+                for k in range(data.n_skills)
+            ]
+            model.AddMinEquality(team_goodness[t], skill_sums)
+
+        # interchangeable teams are ordered by goodness
+        for group in identical_teams(data):
+            for a, b in zip(group, group[1:]):
+                model.Add(team_goodness[a] >= team_goodness[b])
+
+        min_goodness = self.min_goodness = model.NewIntVar(
+            int(lower.min()), int(upper.min()), "min_goodness"
+        )
+        model.AddMinEquality(min_goodness, team_goodness)
+        model.Maximize(sum(team_goodness) + solver2.MIN_WEIGHT * min_goodness)
+
+    def counts_of(self, x):
+        """students of every class in every team of a 0/1 assignment matrix"""
+        return np.array([x[m].sum(axis=0) for m in self.members])
+
+    def expand(self, counts):
+        """a 0/1 (n_students, n_teams) assignment matrix with these class counts"""
+        x = np.zeros((len(self.labels), counts.shape[1]), dtype=int)
+        for c, members in enumerate(self.members):
+            teams = np.repeat(np.arange(counts.shape[1]), counts[c])
+            x[members[: len(teams)], teams] = 1
+        return x
+
+    def hint(self, x, slots):
+        """hints the counts of a 0/1 assignment matrix and a slot index per team"""
+        for (c, t), value in np.ndenumerate(self.counts_of(x)):
+            self.model.AddHint(self.count[c, t], int(value))
+        for t, slot in enumerate(slots):
+            for j in range(self.time_slot.shape[1]):
+                self.model.AddHint(self.time_slot[t, j], j == slot)
+
+    def solution(self, value):
+        """the matching and time slots of a solution, value is a Value() function"""
+        counts = np.vectorize(value, otypes=[int])(self.count)
+        slots = np.vectorize(value, otypes=[int])(self.time_slot).argmax(axis=1)
+        return solver2.solution_to_json(self.expand(counts), slots)
@@ -0,0 +1,297 @@
+"""
+Decomposition mode of solver2 for large cohorts.
+
+The projects are clustered on their skill coefficients into pieces of about
+piece_size teams, every student is handed to one piece (the piece his skills
+fit best, within the team size capacity of the piece) and the pieces are
+solved concurrently in a process pool. The stitched solution is then
+improved by large neighbourhood search: each round frees the weakest team
+together with a few teams of other pieces and re-solves them as one small
+model, keeping the result when the global objective improves.
+
+Every accepted solution is published like an improving CP-SAT solution, so
+the output (stream, out.json, out.csv) is the same as the monolithic mode.
+"""
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from ortools.sat.python import cp_model
+import solver2
+import metrics
+
+DEFAULT_OPTIONS = {
+    # teams per piece
+    "piece_size": 8,
+    # seconds for every piece of the first pass
+    "piece_time_limit": 20,
+    # large neighbourhood repair after stitching
+    "lns_rounds": 30,
+    "lns_teams": 4,
+    "lns_time_limit": 5,
+    "seed": 0,
+}
+
+
+def cluster_teams(data, n_pieces, rng, iterations=20):
+    """k-means over the normalized coefficient rows, returns lists of team indices"""
+    points = data.coefficients / data.coefficients.sum(axis=1, keepdims=True)
+    centers = points[rng.choice(data.n_teams, n_pieces, replace=False)]
+
+    for _ in range(iterations):
+        labels = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        for p in range(n_pieces):
+            if (labels == p).any():
+                centers[p] = points[labels == p].mean(axis=0)
+
+    return [np.flatnonzero(labels == p) for p in range(n_pieces) if (labels == p).any()]
+
+
+def piece_quotas(n_students, pieces):
+    """number of students for every piece, proportional to its team count"""
+    sizes = np.array([len(p) for p in pieces])
+    low, high = sizes * solver2.GRP_SIZ["min"], sizes * solver2.GRP_SIZ["max"]
+
+    share = n_students * sizes / sizes.sum()
+    quota = np.floor(share).astype(int)
+    for p in np.argsort(quota - share)[: n_students - quota.sum()]:
+        quota[p] += 1
+    quota = np.clip(quota, low, high)
+
+    # clipping can leave students over or missing, move them one at a time
+    while quota.sum() < n_students:
+        quota[np.flatnonzero(quota < high)[0]] += 1
+    while quota.sum() > n_students:
+        quota[np.flatnonzero(quota > low)[0]] -= 1
+    return quota
+
+
+def assign_students(data, pieces, quota):
+    """hands every student to a piece, the most decided students choose first"""
+    weights = np.array([
+        (data.coefficients[p] / data.coefficients[p].sum(axis=1, keepdims=True)).mean(axis=0)
+        for p in pieces
+    ])
+    score = data.np_students @ weights.T
+
+    ranked = np.sort(score, axis=1)
+    regret = ranked[:, -1] - (ranked[:, -2] if len(pieces) > 1 else 0)
+
+    remaining = quota.copy()
+    members = [[] for _ in pieces]
+    for i in np.argsort(-regret):
+        for p in np.argsort(-score[i]):
+            if remaining[p] > 0:
+                members[p].append(i)
+                remaining[p] -= 1
+                break
+    return [np.array(sorted(m), dtype=int) for m in members]
+
+
+def solve_model(data, options, time_limit, num_workers, hint=None, solver=None, pins=None):
+    """
+    solves a (sub) dataset without publishing anything, returns the 0/1
+    assignment matrix and the slot index of every team, None if no
+    solution was found in time. pins are (student, team) and (team, slot)
+    index pairs the solution must have
+    """
+    team_model = solver2.TeamModel(data, options)
+
+    if hint is not None:
+        solver2.add_hint(team_model, *hint)
+    if pins is not None:
+        student_pins, slot_pins = pins
+        for i, t in student_pins:
+            team_model.model.Add(team_model.assignment[i, t] == 1)
+        for t, j in slot_pins:
+            team_model.model.Add(team_model.time_slot[t, j] == 1)
+
+    solver = solver or cp_model.CpSolver()
+    solver2.apply_profile(solver, options.get("profile"))
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = num_workers
+
+    status = solver.Solve(team_model.model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    x = np.array(
+        [[solver.BooleanValue(v) for v in row] for row in team_model.assignment], dtype=int
+    )
+    slots = np.array(
+        [[solver.BooleanValue(v) for v in row] for row in team_model.time_slot], dtype=int
+    ).argmax(axis=1)
+    return x, slots
+
+
+def step_time(seconds, limits):
+    """the seconds of one solve, within what is left of the time budget"""
+    if limits is None:
+        return seconds
+    return limits.time_for(seconds)
+
+
+def solve_piece(data, options, deadline=None):
+    # runs in the process pool, one search worker per piece. deadline is
+    # wall clock time, a piece waiting for a free process gets what is left
+    time_limit = options["piece_time_limit"]
+    if deadline is not None:
+        time_limit = max(min(time_limit, deadline - time.time()), 0.001)
+    return solve_model(data, options, time_limit, 1)
+
+
+def stop_pool(pool):
+    # the running pieces do not see cancelled, their processes are ended
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def solve_pieces(data, pieces, members, options, num_workers, cancelled, limits=None):
+    x = np.zeros((data.n_students, data.n_teams), dtype=int)
+    slots = np.zeros(data.n_teams, dtype=int)
+    failed = []
+    deadline = None
+    if limits is not None and limits.remaining() is not None:
+        deadline = time.time() + limits.remaining()
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(num_workers, len(pieces)), mp_context=context) as pool:
+        futures = {
+            pool.submit(solve_piece, data.subset(members[p], pieces[p]), options, deadline): p
+            for p in range(len(pieces))
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if cancelled is not None and cancelled.is_set():
+                stop_pool(pool)
+                return None
+
+            for future in done:
+                p = futures[future]
+                result = future.result()
+                if result is None:
+                    failed.append(p)
+                    continue
+                x[np.ix_(members[p], pieces[p])] = result[0]
+                slots[pieces[p]] = result[1]
+
+    if failed:
+        # a piece can be infeasible (its students' time slots do not fit
+        # its teams), solve those pieces again together with the next one
+        if len(failed) < len(pieces):
+            failed.append(next(p for p in range(len(pieces)) if p not in failed))
+        teams = np.concatenate([pieces[p] for p in failed])
+        students = np.concatenate([members[p] for p in failed])
+        print(f"decompose: re-solving pieces {failed} together", file=sys.stderr)
+
+        result = solve_model(
+            data.subset(students, teams), options,
+            step_time(options["piece_time_limit"] * len(failed), limits), num_workers,
+        )
+        if result is None:
+            return None
+        x[np.ix_(students, teams)] = 0
+        x[np.ix_(students, teams)] = result[0]
+        slots[teams] = result[1]
+
+    return x, slots
+
+
+def neighbourhood(data, x, pieces_of, options, rng):
+    """the weakest team and a few teams of other pieces, with their students"""
+    goodness = solver2.team_goodness_values(data, x)
+    worst = int(goodness.argmin())
+
+    others = np.flatnonzero(pieces_of != pieces_of[worst])
+    if len(others) < options["lns_teams"] - 1:
+        others = np.setdiff1d(np.arange(data.n_teams), [worst])
+    chosen = rng.choice(others, min(options["lns_teams"] - 1, len(others)), replace=False)
+
+    teams = np.concatenate([[worst], chosen]).astype(int)
+    students = np.flatnonzero(x[:, teams].any(axis=1))
+    return students, teams
+
+
+def solve(data, options, publish, solver=None, cancelled=None, initial=None, phases=None,
+          limits=None):
+    """
+    initial is an already published (x, slots) solution, the repair starts
+    from it when the stitched pieces are worse or could not be solved.
+    limits (solver2.SolveLimits) bounds every piece and round by the time
+    budget, cancelled is set when a stop rule fires
+    """
+    options = {**DEFAULT_OPTIONS, **options}
+    phases = phases or metrics.Phases()
+    num_workers = options["num_workers"] or max(os.cpu_count() - 1, 1)
+    rng = np.random.default_rng(options["seed"])
+    started = time.perf_counter()
+
+    def publish_solution(x, slots):
+        publish(*solver2.solution_to_json(x, slots))
+
+    n_pieces = max(1, round(data.n_teams / options["piece_size"]))
+    pieces = cluster_teams(data, n_pieces, rng)
+    members = assign_students(data, pieces, piece_quotas(data.n_students, pieces))
+    print(
+        f"decompose: {len(pieces)} pieces of {[len(p) for p in pieces]} teams, "
+        f"{[len(m) for m in members]} students",
+        file=sys.stderr,
+    )
+
+    with phases.phase("pieces"):
+        result = solve_pieces(data, pieces, members, options, num_workers, cancelled, limits)
+    phases.size(pieces=len(pieces))
+    if result is None and cancelled is not None and cancelled.is_set():
+        return "CANCELLED"
+
+    if result is not None and (
+        initial is None
+        or solver2.objective_value(data, result[0]) > solver2.objective_value(data, initial[0])
+    ):
+        x, slots = result
+        publish_solution(x, slots)
+        print(f"decompose: stitched after {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    elif initial is not None:
+        x, slots = initial
+        print("decompose: repairing the initial solution", file=sys.stderr)
+    else:
+        # pieces without a solution in their time prove nothing
+        return "UNKNOWN"
+
+    best = solver2.objective_value(data, x)
+
+    pieces_of = np.empty(data.n_teams, dtype=int)
+    for p, teams in enumerate(pieces):
+        pieces_of[teams] = p
+
+    for _ in range(options["lns_rounds"]):
+        if cancelled is not None and cancelled.is_set():
+            return "CANCELLED"
+
+        students, teams = neighbourhood(data, x, pieces_of, options, rng)
+        sub_x = x[np.ix_(students, teams)]
+        with phases.phase("lns"):
+            result = solve_model(
+                data.subset(students, teams), options,
+                step_time(options["lns_time_limit"], limits), num_workers,
+                hint=(sub_x, slots[teams]), solver=solver,
+            )
+        if result is None:
+            continue
+
+        candidate = x.copy()
+        candidate[np.ix_(students, teams)] = result[0]
+        value = solver2.objective_value(data, candidate)
+        if value > best:
+            best, x = value, candidate
+            slots = slots.copy()
+            slots[teams] = result[1]
+            publish_solution(x, slots)
+
+    print(f"decompose: finished after {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return "FEASIBLE"
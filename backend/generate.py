@@ -0,0 +1,135 @@
+"""
+Seeded generator of synthetic cohorts for testing and benchmarking.
+
+Writes Company.csv and Student.csv in the upload format, plus a config.json
+matching them (time slot columns, weighted skills), into a directory:
+
+    python backend/generate.py bench/400x80 --students 400 --projects 80 --seed 1
+
+The solvers read files/ and config.json relative to the working directory,
+so they run on the generated cohort from inside that directory.
+"""
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+CONFIG_FILE = "config.json"
+
+
+def parse_distribution(text):
+    """'1,1,2,3,3' -> probabilities of the ratings 1 to 5"""
+    weights = np.array([float(w) for w in text.split(",")])
+    if len(weights) != 5 or (weights < 0).any() or weights.sum() == 0:
+        raise ValueError(f"expected 5 non negative rating weights, got {text!r}")
+    return weights / weights.sum()
+
+
+def generate(
+    n_students,
+    n_projects,
+    n_skills=32,
+    n_slots=2,
+    student_ratings="1,1,1,1,1",
+    company_ratings="1,1,1,1,1",
+    availability=0.75,
+    seed=0,
+    base_config=None,
+):
+    """
+    returns (company_df, student_df, config), every student available at
+    one slot at least, the config is base_config with the generated slots
+    and skill names
+    """
+    if base_config is None:
+        with open(CONFIG_FILE) as f:
+            base_config = json.load(f)
+
+    group_size = base_config["group_size"]
+    if not group_size["min"] * n_projects <= n_students <= group_size["max"] * n_projects:
+        raise ValueError(
+            f"{n_students} students do not fit {n_projects} teams of "
+            f"{group_size['min']} to {group_size['max']}"
+        )
+
+    rng = np.random.default_rng(seed)
+    skills = [f"Skill {k + 1:02d}" for k in range(n_skills)]
+    slots = [f"Slot {j + 1}" for j in range(n_slots)]
+    ratings = np.arange(1, 6)
+
+    available = (rng.random((n_students, n_slots)) < availability).astype(int)
+    if n_slots:
+        nowhere = available.sum(axis=1) == 0
+        available[nowhere, rng.integers(0, n_slots, nowhere.sum())] = 1
+
+    student_df = pd.DataFrame({
+        "Name": [f"Student{i + 1:05d}" for i in range(n_students)],
+        "EID": [f"EID{i + 1:05d}" for i in range(n_students)],
+        **{slot: available[:, j] for j, slot in enumerate(slots)},
+        **dict(zip(skills, rng.choice(
+            ratings, (n_skills, n_students), p=parse_distribution(student_ratings)
+        ))),
+    })
+    company_df = pd.DataFrame({
+        "Project_ID": [f"P{t + 1:04d}" for t in range(n_projects)],
+        "Company": [f"Company{t % 50 + 1}" for t in range(n_projects)],
+        "Project_Title": [f"Project {t + 1}" for t in range(n_projects)],
+        **dict(zip(skills, rng.choice(
+            ratings, (n_skills, n_projects), p=parse_distribution(company_ratings)
+        ))),
+    })
+
+    # the weights of the base config move to the first generated skills
+    weights = list(base_config["skill_importance"].values())[:n_skills]
+    config = {
+        **base_config,
+        "skill_importance": dict(zip(skills, weights)),
+        "time_avaliability": slots,
+    }
+    return company_df, student_df, config
+
+
+def write_cohort(directory, company_df, student_df, config):
+    """directory/config.json and directory/files/{Company,Student}.csv"""
+    os.makedirs(os.path.join(directory, "files"), exist_ok=True)
+    company_df.to_csv(os.path.join(directory, "files", "Company.csv"), index=False)
+    student_df.to_csv(os.path.join(directory, "files", "Student.csv"), index=False)
+    with open(os.path.join(directory, CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=4)
+
+
+def add_arguments(parser):
+    # shared with benchmark.py
+    parser.add_argument("--skills", type=int, default=32)
+    parser.add_argument("--slots", type=int, default=2)
+    parser.add_argument(
+        "--student-ratings", default="1,1,1,1,1", help="weights of the ratings 1 to 5"
+    )
+    parser.add_argument(
+        "--company-ratings", default="1,1,1,1,1", help="weights of the ratings 1 to 5"
+    )
+    parser.add_argument(
+        "--availability", type=float, default=0.75,
+        help="probability that a student is available at a slot",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--students", type=int, required=True)
+    parser.add_argument("--projects", type=int, required=True)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        cohort = generate(
+            args.students, args.projects, args.skills, args.slots,
+            args.student_ratings, args.company_ratings, args.availability, args.seed,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    write_cohort(args.directory, *cohort)
+    print(f"{args.students} students, {args.projects} projects written to {args.directory}")
@@ -0,0 +1,194 @@
+"""
+Fast constructive solution for solver2, found in milliseconds so the
+dashboard has teams to show before CP-SAT reports its first solution, and
+handed to CP-SAT as a hint.
+
+1. time slots: the teams are split over the slots in proportion to the
+   students available at each slot
+2. greedy: the weakest team repeatedly picks the available student that
+   raises its goodness the most, until every team has the minimum size,
+   then the remaining students (least flexible first) join the team where
+   they add the most
+3. local search: swaps between a member of the weakest team and any other
+   student, and moves into the weakest team, evaluated for all candidates
+   at once with NumPy, as long as the objective improves
+
+Works on the same Dataset (coefficients, ratings, availability) as the model.
+"""
+import time
+import numpy as np
+import solver2
+
+
+def split_slots(data):
+    """slot index for every team, None when the availability can not be met"""
+    n_slots = data.np_available.shape[1]
+    available = data.np_available.sum(axis=0).astype(float)
+
+    counts = np.floor(data.n_teams * available / available.sum()).astype(int)
+    for j in np.argsort(-available)[: data.n_teams - counts.sum()]:
+        counts[j] += 1
+
+    # students only available at one slot need enough places there
+    only = np.array([
+        ((data.np_available[:, j] == 1) & (data.np_available.sum(axis=1) == 1)).sum()
+        for j in range(n_slots)
+    ])
+    for j in range(n_slots):
+        while counts[j] * solver2.GRP_SIZ["max"] < only[j]:
+            donors = [k for k in range(n_slots) if k != j and counts[k] > 0
+                      and (counts[k] - 1) * solver2.GRP_SIZ["max"] >= only[k]]
+            if not donors:
+                return None
+            counts[donors[0]] -= 1
+            counts[j] += 1
+
+    return np.repeat(np.arange(n_slots), counts)
+
+
+def greedy(data, slots):
+    n_students, n_teams = data.n_students, data.n_teams
+    x = np.zeros((n_students, n_teams), dtype=int)
+    sums = np.zeros((n_teams, data.n_skills), dtype=np.int64)
+    size = np.zeros(n_teams, dtype=int)
+    free = np.ones(n_students, dtype=bool)
+    can_join = data.np_available[:, slots] == 1  # (n_students, n_teams)
+
+    def join(i, t):
+        x[i, t] = 1
+        sums[t] += data.np_students[i]
+        size[t] += 1
+        free[i] = False
+
+    # every team up to the minimum size, the weakest team picks first
+    for _ in range(solver2.GRP_SIZ["min"] * n_teams):
+        open_teams = np.flatnonzero(size < solver2.GRP_SIZ["min"])
+        if len(open_teams) == 0:
+            break
+        goodness = (sums[open_teams] * data.coefficients[open_teams]).min(axis=1)
+        t = open_teams[goodness.argmin()]
+
+        candidates = np.flatnonzero(free & can_join[:, t])
+        if len(candidates) == 0:
+            return None
+        gain = ((sums[t] + data.np_students[candidates]) * data.coefficients[t]).min(axis=1)
+        join(candidates[gain.argmax()], t)
+
+    # everybody else, the students with the fewest possible teams first
+    rest = np.flatnonzero(free)
+    for i in rest[np.argsort(can_join[rest].sum(axis=1), kind="stable")]:
+        teams = np.flatnonzero(can_join[i] & (size < solver2.GRP_SIZ["max"]))
+        if len(teams) == 0:
+            return None
+        before = (sums[teams] * data.coefficients[teams]).min(axis=1)
+        after = ((sums[teams] + data.np_students[i]) * data.coefficients[teams]).min(axis=1)
+        # weak teams first, then the biggest gain
+        order = np.lexsort((-(after - before), before))
+        join(i, teams[order[0]])
+
+    return x
+
+
+def improve(data, x, slots, time_limit):
+    """swap/move local search around the weakest team, x is changed in place"""
+    students = data.np_students
+    coefficients = data.coefficients
+    can_join = data.np_available[:, slots] == 1
+    deadline = time.perf_counter() + time_limit
+
+    team_of = x.argmax(axis=1)
+    sums = x.T @ students
+    goodness = (sums * coefficients).min(axis=1)
+    size = x.sum(axis=0)
+
+    def objective(goodness):
+        return goodness.sum() + solver2.MIN_WEIGHT * goodness.min()
+
+    best = objective(goodness)
+
+    while time.perf_counter() < deadline:
+        w = int(goodness.argmin())
+        members = np.flatnonzero(team_of == w)
+        others = np.flatnonzero((team_of != w) & can_join[:, w])
+
+        # goodness of the other teams without w and without a given team
+        order = np.argsort(goodness)
+        rest = order[order != w]
+
+        def min_without(teams):
+            if len(rest) < 2:
+                return np.full(teams.shape, np.inf)
+            return np.where(teams == rest[0], goodness[rest[1]], goodness[rest[0]])
+
+        candidates = []
+
+        # swap member a of w with student b of team u
+        if len(members) and len(others):
+            a = members[:, None]
+            b = others[None, :]
+            u = team_of[others][None, :]
+            ok = can_join[a, u]
+            new_w = ((sums[w] - students[a] + students[b]) * coefficients[w]).min(axis=2)
+            new_u = ((sums[u] - students[b] + students[a]) * coefficients[u]).min(axis=2)
+            low = np.minimum(np.minimum(new_w, new_u), min_without(u))
+            value = (goodness.sum() - goodness[w] - goodness[u] + new_w + new_u
+                     + solver2.MIN_WEIGHT * low)
+            value = np.where(ok, value, -np.inf)
+            k = np.unravel_index(value.argmax(), value.shape)
+            candidates.append((value[k], "swap", int(members[k[0]]), int(others[k[1]])))
+
+        # move student b of a team bigger than the minimum into w
+        if size[w] < solver2.GRP_SIZ["max"] and len(others):
+            movable = others[size[team_of[others]] > solver2.GRP_SIZ["min"]]
+            if len(movable):
+                u = team_of[movable]
+                new_w = ((sums[w] + students[movable]) * coefficients[w]).min(axis=1)
+                new_u = ((sums[u] - students[movable]) * coefficients[u]).min(axis=1)
+                low = np.minimum(np.minimum(new_w, new_u), min_without(u))
+                value = (goodness.sum() - goodness[w] - goodness[u] + new_w + new_u
+                         + solver2.MIN_WEIGHT * low)
+                k = int(value.argmax())
+                candidates.append((value[k], "move", None, int(movable[k])))
+
+        if not candidates:
+            break
+        value, kind, a, b = max(candidates, key=lambda c: c[0])
+        if value <= best:
+            break
+
+        u = team_of[b]
+        if kind == "swap":
+            team_of[a], team_of[b] = u, w
+            sums[w] += students[b] - students[a]
+            sums[u] += students[a] - students[b]
+        else:
+            team_of[b] = w
+            sums[w] += students[b]
+            sums[u] -= students[b]
+            size[w] += 1
+            size[u] -= 1
+
+        for t in (w, u):
+            goodness[t] = (sums[t] * coefficients[t]).min()
+        best = objective(goodness)
+
+    x[:] = 0
+    x[np.arange(data.n_students), team_of] = 1
+    return x
+
+
+def solve(data, time_limit=0.2):
+    """
+    a feasible (x, slots) for the dataset, x the 0/1 (n_students, n_teams)
+    assignment matrix and slots the slot index of every team, None when
+    the greedy construction gets stuck
+    """
+    slots = split_slots(data)
+    if slots is None:
+        return None
+
+    x = greedy(data, slots)
+    if x is None:
+        return None
+
+    return improve(data, x, slots, time_limit), slots
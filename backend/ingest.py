@@ -0,0 +1,227 @@
+"""
+Ingest stage of the uploaded files: Company.csv and Student.csv are parsed
+and verified (verifier.py) once, and the parsed ratings, availability and
+ids are written as .npy files to <workspace>/dataset/. The next solve
+requests take the verification result from there, and the solver
+(solver2.load_data) memory maps the arrays instead of parsing the text.
+
+    dataset/meta.json             the files and config it was made from,
+                                  the verification errors, the skill names
+    dataset/company_ratings.npy   raw 1-5 ratings, (projects, skills)
+    dataset/student_ratings.npy   raw 1-5 ratings, (students, skills)
+    dataset/available.npy         0/1, (students, time slots)
+    dataset/project_ids.npy, student_names.npy, student_eids.npy
+                                  the ids as read, numbers or strings
+
+The arrays are only written for files without verification errors. An
+ingest made from other files (sha256 of their content) or another config is
+ignored and made again. The verdicts of the last MAX_VERDICTS file pairs
+are also kept in memory, files with errors that are uploaded again are not
+verified again.
+
+The server runs ingest() in a thread as soon as both files are uploaded, a
+solve then only waits for (or looks up) the verdict.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+import tempfile
+import numpy as np
+import metrics
+import verifier
+
+CONFIG_FILE = "config.json"
+DATASET_DIR = "dataset"
+
+# what the verification and the arrays depend on
+CONFIG_SECTIONS = [
+    "student_mapping",
+    "company_mapping",
+    "skill_importance",
+    "time_avaliability",
+    "verifier",
+]
+ARRAYS = [
+    "company_ratings",
+    "student_ratings",
+    "available",
+    "project_ids",
+    "student_names",
+    "student_eids",
+]
+# kept with the dtype pandas read them with (numbers stay numbers, like the
+# csv path of solver2), strings are object arrays that cannot be memory mapped
+ID_ARRAYS = ["project_ids", "student_names", "student_eids"]
+# changed with the layout of the arrays, older ingests are made again
+FORMAT = 2
+
+
+MAX_VERDICTS = 32
+
+# path -> (size, mtime, sha256), a file is only hashed again when it changes
+digests = {}
+# source key -> errors, the least recently used first
+verdicts = OrderedDict()
+verdicts_lock = threading.Lock()
+
+
+def file_digest(path):
+    """sha256 of the content of a file"""
+    with open(path, "rb") as file:
+        # the stat of the open file, a file replaced meanwhile is not mixed up
+        stat = os.fstat(file.fileno())
+        known = digests.get(os.path.abspath(path))
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        digest = hashlib.sha256()
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    digests[os.path.abspath(path)] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def source_key(comp_path, stud_path):
+    with open(CONFIG_FILE) as f:
+        config = json.load(f)
+    return {
+        "format": FORMAT,
+        "files": [file_digest(p) for p in (comp_path, stud_path)],
+        "config": {k: config.get(k) for k in CONFIG_SECTIONS},
+    }
+
+
+def remember(key, errors):
+    key = json.dumps(key, sort_keys=True)
+    with verdicts_lock:
+        verdicts[key] = errors
+        verdicts.move_to_end(key)
+        while len(verdicts) > MAX_VERDICTS:
+            verdicts.popitem(last=False)
+
+
+def known_errors(key):
+    """the errors of an earlier verification of these files, None if unknown"""
+    key = json.dumps(key, sort_keys=True)
+    with verdicts_lock:
+        errors = verdicts.get(key)
+        if errors is not None:
+            verdicts.move_to_end(key)
+        return errors
+
+
+def compact(array):
+    # ratings and availability are small non negative integers
+    if array.size and array.min() >= 0:
+        return array.astype(np.min_scalar_type(array.max()))
+    return array
+
+
+def frame_arrays(company_df, student_df):
+    n_slots = len(verifier.AVA_LST)
+    return {
+        "company_ratings": compact(company_df.iloc[:, 3:].astype(int).to_numpy()),
+        "student_ratings": compact(student_df.iloc[:, 2 + n_slots:].astype(int).to_numpy()),
+        "available": compact(student_df.iloc[:, 2:2 + n_slots].astype(int).to_numpy()),
+        "project_ids": company_df["Project_ID"].to_numpy(),
+        "student_names": student_df["Name"].to_numpy(),
+        "student_eids": student_df["EID"].to_numpy(),
+    }
+
+
+def read_meta(directory):
+    try:
+        with open(os.path.join(directory, DATASET_DIR, "meta.json")) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def current(comp_path, stud_path):
+    """the meta data of the ingest of these files, None if missing or stale"""
+    meta = read_meta(os.path.dirname(comp_path))
+    try:
+        key = source_key(comp_path, stud_path)
+    except OSError:
+        return None
+    if meta is None or meta.get("source") != key:
+        return None
+    return meta
+
+
+def ingest(comp_path, stud_path, phases=None, max_errors=verifier.MAX_ERR):
+    """
+    returns the verification errors of the files, from the last ingest when
+    the files did not change, the arrays are written next to the files
+    """
+    phases = phases or metrics.Phases()
+    meta = current(comp_path, stud_path)
+    if meta is not None:
+        phases.size(verified_rows=meta["rows"], ingested=1)
+        return meta["errors"]
+
+    # taken before reading, a file replaced meanwhile makes the ingest stale
+    key = source_key(comp_path, stud_path)
+    # files without errors need their arrays, only failed ones are looked up
+    errors = known_errors(key)
+    if errors:
+        phases.size(ingested=1)
+        return errors
+
+    errors, company_df, student_df = verifier.read_and_verify(
+        comp_path, stud_path, max_errors, phases
+    )
+
+    directory = os.path.dirname(comp_path)
+    meta = {"source": key, "errors": errors, "rows": phases.sizes.get("verified_rows", 0)}
+
+    with phases.phase("ingest_write"):
+        # built next to the old one and renamed into place, a solver still
+        # mapping the old arrays keeps its (unlinked) files
+        tmp_dir = tempfile.mkdtemp(dir=directory or ".", prefix=".tmp_dataset_")
+        try:
+            os.chmod(tmp_dir, 0o755)
+            if not errors:
+                n_slots = len(verifier.AVA_LST)
+                meta.update(
+                    skills=list(student_df.columns[2 + n_slots:]),
+                    company_skills=list(company_df.columns[3:]),
+                )
+                for name, array in frame_arrays(company_df, student_df).items():
+                    np.save(os.path.join(tmp_dir, name + ".npy"), array)
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as file:
+                json.dump(meta, file)
+
+            shutil.rmtree(os.path.join(directory, DATASET_DIR), ignore_errors=True)
+            os.replace(tmp_dir, os.path.join(directory, DATASET_DIR))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    remember(key, errors)
+    phases.size(ingested=0)
+    return errors
+
+
+def load(comp_path, stud_path):
+    """
+    (meta, arrays) of a current ingest without errors, the arrays memory
+    mapped, None otherwise
+    """
+    meta = current(comp_path, stud_path)
+    if meta is None or meta["errors"]:
+        return None
+    directory = os.path.join(os.path.dirname(comp_path), DATASET_DIR)
+    try:
+        arrays = {
+            name: np.load(
+                os.path.join(directory, name + ".npy"),
+                mmap_mode=None if name in ID_ARRAYS else "r", allow_pickle=name in ID_ARRAYS,
+            )
+            for name in ARRAYS
+        }
+    except (OSError, ValueError):
+        return None
+    return meta, arrays
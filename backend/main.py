@@ -1,19 +1,421 @@
 import os
-import signal
+import sys
 import tornado.ioloop
 import tornado.web
+import tornado.locks
+import tornado.iostream
 import json
-import verifier
+import math
+import ingest
+import upload
+import stream
+import cache
+import metrics
 import asyncio
+import collections
+import concurrent.futures
+import datetime
+import email.utils
+import gzip
+import time
+import uuid
+import zlib
 
 UPLOAD_FILE_DIR = "files/"
-MOST_RECENT_FILE = "source"
 RES_FILE = UPLOAD_FILE_DIR + "out.json"
-STU_FILE = UPLOAD_FILE_DIR + "Student.csv"
-COM_FILE = UPLOAD_FILE_DIR + "Company.csv"
-output_csv = UPLOAD_FILE_DIR + "out.csv"
 
-solver_proc = None
+WORKER_SCRIPT = "backend/worker.py"
+CONFIG_FILE = "config.json"
+
+# largest accepted upload, the body is streamed to disk
+UPLOAD_MAX_BYTES = 1024 ** 3
+
+# verification and ingest of the uploaded files, off the IOLoop. One thread,
+# two ingests of the same workspace never write its dataset/ at once
+ingest_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+# the solve options a client may set in the /action/solve body
+SOLVE_OPTIONS = [
+    "availability", "warm_start", "mode", "piece_size", "lns_rounds", "heuristic", "compress",
+    "objective", "min_time", "total_time", "payload", "time_limit", "gap", "plateau", "profile",
+]
+
+# the values of the choice options, the same as the solver2.py command line
+OPTION_CHOICES = {
+    "availability": ["aggregated", "pairwise", "full"],
+    "mode": ["monolithic", "decompose"],
+    "compress": ["auto", "always", "never"],
+    "objective": ["weighted", "lexicographic"],
+    "payload": ["rows", "columns"],
+}
+
+JOBS_DIR = UPLOAD_FILE_DIR + "jobs/"
+# the job of the original single-job endpoints (/file/upload, /action/solve,
+# /matching, ...), its workspace is files/ itself
+DEFAULT_JOB = "default"
+
+# solves running at the same time, each in its own worker process, the
+# others wait in the queue
+MAX_RUNNING_JOBS = 2
+# CP-SAT search workers shared by the running solves
+CPU_BUDGET = max(os.cpu_count() - 1, 1)
+
+# idle event streams send a comment this often, so closed clients are noticed
+KEEPALIVE = datetime.timedelta(seconds=15)
+
+# part of the ETag of a result, the solution seq starts over with the server
+SERVER_ID = uuid.uuid4().hex[:8]
+# block size of the out.csv download
+DOWNLOAD_CHUNK = 64 * 1024
+
+
+registry = metrics.Registry()
+registry.describe("phase_seconds", "summary", "Time spent in each phase of verification and solving")
+registry.describe("last_size", "gauge", "Sizes of the last verification and solve (rows, variables, constraints, bytes written)")
+registry.describe("solves_total", "counter", "Finished solves by job status")
+registry.describe("solve_seconds", "summary", "Wall time of the solves in the worker")
+registry.describe("stream_records_total", "counter", "Solver stream records relayed to the clients")
+registry.describe("upload_bytes_total", "counter", "Bytes of uploaded files")
+registry.describe("cache_requests_total", "counter", "Result cache lookups")
+registry.describe("request_seconds", "summary", "Time to handle an http request")
+registry.describe("jobs", "gauge", "Jobs by status")
+
+
+async def relay_solver_output(proc, job):
+    # the only reader of the solver stdout, every client is served from
+    # job.state so any number of them can follow the same solve
+    # returns the final {"type": "done"} record, None if the worker died
+    while True:
+        line = await proc.stdout.readline()
+        if not line:  # EOFs
+            return None
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            print(line.decode("utf-8", errors="replace"), end="")
+            continue
+
+        if record.get("type") == "done":
+            return record
+
+        registry.inc("stream_records_total", type=record.get("type"))
+        job.state.apply(record)
+        job.changed.notify_all()
+
+
+class Solver_Worker:
+    """
+    A long lived solver process (backend/worker.py). It keeps the solver
+    imports and the last parsed files warm, solve jobs and cancels are sent
+    to it as json lines on its stdin. One job at a time.
+    """
+
+    def __init__(self):
+        self.proc = None
+        # config_digest() of the config.json the process was started with,
+        # the solver modules read it once on import
+        self.config = None
+
+    async def start(self):
+        config = cache.config_digest()
+        if self.proc is not None and self.proc.returncode is None:
+            if config == self.config:
+                return
+            print("config.json changed, restarting the solver worker")
+            await self.stop()
+
+        # really important to add -u to allow real-time output
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        self.config = config
+
+    async def stop(self):
+        # the worker exits when its stdin is closed
+        self.proc.stdin.close()
+        await self.proc.wait()
+        self.proc = None
+
+    def send(self, command):
+        self.proc.stdin.write((json.dumps(command) + "\n").encode("utf-8"))
+
+    async def solve(self, job, options):
+        await self.start()
+        self.send({"cmd": "solve", "options": options, "workspace": job.workspace})
+        result = await relay_solver_output(self.proc, job)
+        if result is None:
+            # restarted on the next solve
+            print("Solver worker exited unexpectedly")
+            self.proc = None
+        return result
+
+    def cancel(self):
+        self.send({"cmd": "cancel"})
+
+
+class Job:
+    """
+    One set of uploaded files in its own workspace directory, and the
+    solution of its running (or last) solve rebuilt from the solver stream
+    """
+
+    def __init__(self, job_id, workspace):
+        self.id = job_id
+        self.workspace = workspace
+        # idle, queued, running, finished, cancelled or failed
+        self.status = "idle"
+        self.options = {}
+        self.num_workers = None
+        self.result = None
+        self.worker = None
+        self.cancel_requested = False
+        # input_key of the files being solved, the result is cached under it
+        self.cache_key = None
+        # file_digests of the files being solved
+        self.cache_files = None
+        # server side phases of the solve request (verification, cache, queue)
+        self.phases = metrics.Phases()
+        self.queued_at = None
+        # the verification (ingest.ingest) of the files, started at upload
+        self.verification = None
+        self.verified_files = None
+
+        self.state = stream.SolutionState()
+        self.changed = tornado.locks.Condition()
+        self.saved = None
+        self.saved_key = None
+        # [tag, modified, json, gzip json] of the result last served by /match
+        self.served = None
+
+    def path(self, name):
+        return os.path.join(self.workspace, name)
+
+    def solution(self):
+        """
+        the current solution as a snapshot record, None if there is none.
+        Served from memory, out.json is only read for a job not solved
+        since the server started, and read again only when it changes.
+        """
+        if self.state.header is not None:
+            return self.state.snapshot()
+
+        result_file = self.path("out.json")
+        if not os.path.exists(result_file):
+            return None
+        key = (os.stat(result_file).st_mtime_ns, os.stat(result_file).st_size)
+        if key != self.saved_key:
+            with open(result_file, 'r') as file:
+                print(f"Reading from {result_file}")
+                self.saved = {"type": "snapshot", "seq": 0, **json.load(file)}
+            self.saved_key = key
+        return self.saved
+
+    def result_json(self):
+        """
+        (version tag, modification time, json bytes) of the current result,
+        serialized once per solution seq
+        """
+        solution = self.solution()
+        if self.state.header is not None:
+            tag = f"{SERVER_ID}-{self.state.generation}-{self.state.seq}"
+        elif solution is not None:
+            tag = "saved-%x-%x" % self.saved_key
+        else:
+            tag = "empty"
+
+        if self.served is None or self.served[0] != tag:
+            if solution is not None:
+                result = {k: v for k, v in solution.items() if k not in ("type", "seq")}
+            else:
+                result = {"students": [], "projects": [], "skills": {}, "matching": {}}
+            modified = self.saved_key[0] / 1e9 if tag.startswith("saved") else time.time()
+            self.served = [tag, modified, json.dumps(result).encode("utf-8"), None]
+        return tuple(self.served[:3])
+
+    def result_gzip(self):
+        # compressed on the first request that accepts it
+        self.result_json()
+        if self.served[3] is None:
+            self.served[3] = gzip.compress(self.served[2], compresslevel=6)
+        return self.served[3]
+
+    def input_files(self):
+        # an upload renames a new file into place, the stat tells a new version
+        return tuple(
+            (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            for stat in map(os.stat, (self.path("Company.csv"), self.path("Student.csv")))
+        )
+
+    def verify(self):
+        """
+        a future of the verification errors of the current files, started
+        again only when a file changed
+        """
+        files = self.input_files()
+        if self.verification is not None and files == self.verified_files:
+            return self.verification
+
+        phases = metrics.Phases()
+        future = tornado.ioloop.IOLoop.current().run_in_executor(
+            ingest_pool, ingest.ingest, self.path("Company.csv"), self.path("Student.csv"), phases
+        )
+
+        def done(future):
+            if future.cancelled() or future.exception() is not None:
+                # the next solve tries again
+                if self.verification is future:
+                    self.verification = None
+                return
+            registry.observe_phases(phases.summary())
+
+        future.add_done_callback(done)
+        self.verification, self.verified_files = future, files
+        return future
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def info(self):
+        return {
+            "job": self.id,
+            "status": self.status,
+            "options": self.options,
+            "num_workers": self.num_workers,
+            "result": self.result,
+        }
+
+    def load_cached(self, entry, options):
+        # the cached out.json was copied into the workspace, show it as the
+        # result of a finished solve with the options of the request
+        with open(self.path("out.json"), 'r') as file:
+            self.state.apply({"type": "snapshot", **json.load(file)})
+        self.status = "finished"
+        self.options = options
+        self.result = {**entry["result"], "cached": True}
+        self.changed.notify_all()
+
+
+class Scheduler:
+    """
+    Runs the queued jobs in order, at most MAX_RUNNING_JOBS at once. Every
+    job gets CPU_BUDGET // MAX_RUNNING_JOBS CP-SAT workers, so the running
+    jobs never use more than CPU_BUDGET together. Idle worker processes are
+    kept for the next job.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.queue = collections.deque()
+        self.running = set()
+        self.idle_workers = [Solver_Worker()]
+
+    def create(self, job_id=None):
+        job_id = job_id or uuid.uuid4().hex[:12]
+        workspace = UPLOAD_FILE_DIR if job_id == DEFAULT_JOB else JOBS_DIR + job_id + "/"
+        os.makedirs(workspace, exist_ok=True)
+
+        job = self.jobs[job_id] = Job(job_id, workspace)
+        return job
+
+    def get(self, job_id):
+        # jobs of an earlier server run are found again by their workspace
+        if job_id not in self.jobs:
+            if job_id != DEFAULT_JOB and not os.path.isdir(JOBS_DIR + job_id):
+                return None
+            self.create(job_id)
+        return self.jobs[job_id]
+
+    def submit(self, job, options):
+        job.options = options
+        job.status = "queued"
+        job.result = None
+        job.cancel_requested = False
+        job.state.reset()
+        job.queued_at = time.perf_counter()
+        self.queue.append(job)
+        self.dispatch()
+        job.changed.notify_all()
+
+    def dispatch(self):
+        while self.queue and len(self.running) < MAX_RUNNING_JOBS:
+            job = self.queue.popleft()
+            job.phases.add("queued", time.perf_counter() - job.queued_at)
+            # CP-SAT cannot change its workers during a search, a job started
+            # alone keeps its share when another one starts next to it
+            job.num_workers = max(CPU_BUDGET // MAX_RUNNING_JOBS, 1)
+            job.status = "running"
+            job.worker = self.idle_workers.pop() if self.idle_workers else Solver_Worker()
+            self.running.add(job)
+            tornado.ioloop.IOLoop.current().spawn_callback(self.run, job)
+
+    async def run(self, job):
+        try:
+            job.result = await job.worker.solve(job, {**job.options, "num_workers": job.num_workers})
+        except Exception as e:
+            job.result = {"type": "done", "status": "ERROR", "msg": str(e)}
+            job.worker.proc = None
+
+        status = (job.result or {}).get("status")
+        if job.cancel_requested or status == "CANCELLED":
+            job.status = "cancelled"
+        elif status in (None, "ERROR", "INFEASIBLE", "MODEL_INVALID"):
+            job.status = "failed"
+        else:
+            job.status = "finished"
+        print(f"Solver finished ({job.id}): {job.result}")
+
+        registry.inc("solves_total", status=job.status)
+        if job.result is not None:
+            worker_metrics = job.result.get("metrics", {})
+            registry.observe_phases(worker_metrics)
+            if "wall_time" in job.result:
+                registry.observe("solve_seconds", job.result["wall_time"])
+            # the job result holds the server and the worker phases
+            server_metrics = job.phases.summary()
+            job.result["metrics"] = {
+                "phases": {**server_metrics["phases"], **worker_metrics.get("phases", {})},
+                "sizes": {**server_metrics["sizes"], **worker_metrics.get("sizes", {})},
+            }
+
+        # cancelled solves are cached too, a later continuation can pick them up.
+        # Under the config the worker really solved with, config.json may have
+        # changed since the lookup
+        if job.cache_key is not None and job.status in ("finished", "cancelled"):
+            key = cache.input_key(job.cache_files, job.worker.config, job.options)
+            await tornado.ioloop.IOLoop.current().run_in_executor(
+                None, result_cache.put, key, job.workspace, job.result
+            )
+
+        self.running.discard(job)
+        self.idle_workers.append(job.worker)
+        job.worker = None
+        job.changed.notify_all()
+        self.dispatch()
+
+    def cancel(self, job):
+        if job in self.queue:
+            self.queue.remove(job)
+            job.status = "cancelled"
+            job.changed.notify_all()
+            return True
+        if job.status == "running":
+            job.cancel_requested = True
+            job.worker.cancel()
+            return True
+        return False
+
+    async def start(self):
+        # start one worker right away so the first solve finds it warm
+        for worker in self.idle_workers:
+            await worker.start()
+
+
+scheduler = Scheduler()
+result_cache = cache.ResultCache()
 
 class Base_Handler(tornado.web.RequestHandler):
     def prepare(self):
@@ -27,10 +429,64 @@ class Base_Handler(tornado.web.RequestHandler):
         self.set_header("Access-Control-Allow-Methods", "POST, GET, OPTIONS")
         self.set_header("Content-Type", "application/json")
 
-    def options(self):
+    def options(self, *args):
         self.set_status(204)
         self.finish()
 
+    def accepts_gzip(self):
+        return "gzip" in self.request.headers.get("Accept-Encoding", "")
+
+    def not_modified(self, tag, modified):
+        """
+        sets the ETag and Last-Modified of a response, sends a 304 and
+        returns True when the client already has this version
+        """
+        self.set_header("Vary", "Accept-Encoding")
+        self.set_header("Cache-Control", "no-cache")
+        # the gzip body is another representation, it has its own tag
+        self.set_header("Etag", f'"{tag}-gz"' if self.accepts_gzip() else f'"{tag}"')
+        self.set_header("Last-Modified", datetime.datetime.fromtimestamp(
+            modified, datetime.timezone.utc
+        ))
+
+        if self.request.headers.get("If-None-Match"):
+            unchanged = self.check_etag_header()
+        else:
+            since = self.request.headers.get("If-Modified-Since")
+            try:
+                since = email.utils.parsedate_to_datetime(since).timestamp() if since else None
+            except (TypeError, ValueError):
+                since = None
+            # the header has whole seconds
+            unchanged = since is not None and int(modified) <= since
+        if unchanged:
+            self.set_status(304)
+            self.finish()
+        return unchanged
+
+    def bad_request(self, msg):
+        self.set_status(400)
+        self.finish(json.dumps({"result": "err", "msg": msg}))
+
+    def json_body(self):
+        """the json object of the request body, {} if empty, None after a 400"""
+        try:
+            body = json.loads(self.request.body) if self.request.body else {}
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            self.bad_request("request body is not a json object")
+            return None
+        return body
+
+    def get_job(self, job_id):
+        # the job of the url, or a 404 json error
+        job = scheduler.get(job_id)
+        if job is None:
+            self.set_status(404)
+            self.finish(json.dumps({"result": "err", "msg": f"no job {job_id}"}))
+        return job
+
 
 class Main_Handler(Base_Handler):
     def get(self):
@@ -52,80 +508,173 @@ class Main_Handler(Base_Handler):
         )
 
 
+@tornado.web.stream_request_body
 class Upload_File_Handler(Base_Handler):
-    def post(self):
-        # Do the parsing to verify the file
-        # Sendback the error message or needed file
-        # Start new process of solving combination
-        fileinfo = self.request.files["filearg"][0]
-        # print("fileinfo is", fileinfo)
-        fname = fileinfo["filename"]
-        extn = os.path.splitext(fname)[1]
-        cname = self.get_body_argument("file_type") + extn
-        fh = open(UPLOAD_FILE_DIR + cname, "wb")
-        fh.write(fileinfo["body"])
+    """
+    the multipart body is parsed and checked as it arrives and written to a
+    temp file off the IOLoop (upload.py), then renamed into place
+    """
+
+    async def prepare(self):
+        self.upload = None
+        super().prepare()
+        if self._finished or self.request.method != "POST":
+            return
+        self.job = self.get_job(*(self.path_args or [DEFAULT_JOB]))
+        if self.job is None:
+            return
+
+        boundary = upload.multipart_boundary(self.request.headers.get("Content-Type", ""))
+        if boundary is None:
+            self.set_status(400)
+            self.finish(json.dumps({"result": "err", "msg": "expected a multipart/form-data body"}))
+            return
+        self.request.connection.set_max_body_size(UPLOAD_MAX_BYTES)
+        self.upload = upload.Upload(self.job.workspace, boundary)
+
+    async def data_received(self, chunk):
+        if self.upload is None:
+            return
+        # awaited before the next chunk is read, the chunks stay in order
+        await tornado.ioloop.IOLoop.current().run_in_executor(None, self.upload.feed, chunk)
+
+    async def post(self, job_id=DEFAULT_JOB):
+        cname, errors = await tornado.ioloop.IOLoop.current().run_in_executor(
+            None, self.upload.finish
+        )
+        registry.inc("upload_bytes_total", self.upload.bytes, file=cname)
+        if errors:
+            self.set_status(400)
+            self.finish(json.dumps({
+                "result": "err", "msg": f"Upload rejected: {errors[0]['msg']}", "errors": errors
+            }))
+            return
+        if os.path.exists(self.job.path("Company.csv")) and os.path.exists(self.job.path("Student.csv")):
+            # verified in the background, the solve finds the verdict ready
+            self.job.verify()
         self.finish(cname + " uploaded")
 
+    def on_connection_close(self):
+        if getattr(self, "upload", None) is not None:
+            self.upload.discard()
+
 
 class Current_Alloc_Handler(Base_Handler):
-    async def post(self):
+    async def post(self, job_id=DEFAULT_JOB):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        solution_state = job.state
 
-        global solver_proc
-        
         self.set_header("Content-Type", "text/plain")
         self.set_header("Cache-Control", "no-cache")
         self.set_header("Connection", "keep-alive")
 
-        # Start the solver process
-        # according to example: https://docs.python.org/3.13/library/asyncio-subprocess.html
+        # late joining clients get the full solution first, then the deltas
+        solution = job.solution()
+        if solution is not None:
+            self.write(json.dumps(solution) + '\n')
+        self.flush()
 
-        if os.path.exists(RES_FILE):
-            with open(RES_FILE, 'r') as file:
-                print(f"Reading from {RES_FILE}")
-                data = json.load(file)
+        generation, seq = solution_state.generation, solution_state.seq
 
-                self.write(json.dumps(data) + '\n')
-                self.flush()
-        
-        if solver_proc is None:
-            return
+        while job.active:
+            await job.changed.wait()
 
-        while True:
-            line = await solver_proc.stdout.readline()
-            if not line:  # EOFs
-                break
+            records = solution_state.since(generation, seq)
+            if records is None:
+                records = [solution_state.snapshot()]
 
             try:
-                self.write(line.decode('utf-8'))
-                self.flush()
-            
-            except Exception as e:
-                print(f"Error: {str(e)}")
+                for record in records:
+                    self.write(json.dumps(record) + '\n')
+                await self.flush()
+
+            except tornado.iostream.StreamClosedError:
                 break
 
+            generation, seq = solution_state.generation, solution_state.seq
 
 
+def profile_error(profile):
+    """the message for a profile that is not in config.json, None if it is"""
+    if profile is None:
+        return None
+    with open(CONFIG_FILE) as f:
+        profiles = json.load(f).get("solver", {}).get("profiles", {})
+    # only the named profiles of config.json, no parameters from clients
+    if not isinstance(profile, str) or profile not in profiles:
+        return f"unknown profile {profile!r}, choose from {sorted(profiles)}"
+    return None
+
+
+def option_error(options):
+    """the message for the first invalid solve option, None if all are valid"""
+    if options.get("mode") == "reoptimize":
+        return 'mode "reoptimize" is started with /action/reoptimize'
+    for name, choices in OPTION_CHOICES.items():
+        if name in options and options[name] not in choices:
+            return f"{name} must be one of {choices}"
+    def number(value):
+        return (
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value)
+        )
+
+    # null is no limit for the times, the others have no null
+    for name in ("time_limit", "gap", "plateau"):
+        value = options.get(name)
+        if value is not None and not (number(value) and value >= 0):
+            return f"{name} must be a non negative number"
+    for name in ("min_time", "total_time"):
+        value = options.get(name)
+        if value is not None and not (number(value) and value > 0):
+            return f"{name} must be a positive number"
+    for name, low, kind in (("piece_size", 1, "positive"), ("lns_rounds", 0, "non negative")):
+        value = options.get(name, low)
+        if isinstance(value, bool) or not isinstance(value, int) or value < low:
+            return f"{name} must be a {kind} integer"
+    for name in ("heuristic", "warm_start"):
+        if name in options and not isinstance(options[name], bool):
+            return f"{name} must be true or false"
+    return profile_error(options.get("profile"))
 
-class Alloc_Solve_Handler(Base_Handler):
-    async def post(self):
-        global solver_proc
 
+class Alloc_Solve_Handler(Base_Handler):
+    async def post(self, job_id=DEFAULT_JOB):
         print("?????")
 
-        if solver_proc is not None:
+        job = self.get_job(job_id)
+        if job is None:
+            return
+
+        body = self.json_body()
+        if body is None:
+            return
+        options = {k: v for k, v in body.items() if k in SOLVE_OPTIONS}
+        error = option_error(options)
+        if error:
+            self.bad_request(error)
+            return
+        # "cache": false solves even if the result is cached, "continue": true
+        # keeps solving from a cached result of a solve that was cut short
+        use_cache = body.get("cache", True)
+        continue_solve = body.get("continue", False)
+
+        if job.active:
             self.write(json.dumps(
                 {"result": "err", "msg": "existing an ongoing solver"}
             ))
             return
 
-        if not os.path.exists(STU_FILE):
+        if not os.path.exists(job.path("Student.csv")):
             self.write(json.dumps({
                 "result": "err", 
                 "msg": "Student file does not exist, please upload that first"
             }))
             return
 
-        if not os.path.exists(COM_FILE):
+        if not os.path.exists(job.path("Company.csv")):
             self.write(json.dumps({
                 "result": "err", 
                 "msg": "Company file does not exist, please upload that first"
@@ -133,81 +682,295 @@ class Alloc_Solve_Handler(Base_Handler):
             return
         
         
-        verification_errors = []
-        verification_errors = verifier.verifier(COM_FILE, STU_FILE)
-        if verification_errors != "Success":
+        phases = metrics.Phases()
+        # parsed and verified once per upload (usually already done by now),
+        # later solves reuse the ingest
+        with phases.phase("verify_wait"):
+            verification_errors = await job.verify()
+        if job.active:
+            # another solve started meanwhile
+            self.write(json.dumps(
+                {"result": "err", "msg": "existing an ongoing solver"}
+            ))
+            return
+        if verification_errors:
             self.write(json.dumps({
                 "result": "err", 
-                "msg": f"Verification failed: {verification_errors}"
+                "msg": f"Verification failed: {verification_errors[0]['msg']}"
+                       + (f" (and {len(verification_errors) - 1} more)" if len(verification_errors) > 1 else ""),
+                "errors": verification_errors
             }))
             return
     
-        self.write(json.dumps({"result": "success", "msg": "Solver started"}))
-        self.finish()
+        with phases.phase("cache_lookup"):
+            job.cache_files = cache.file_digests(job.path("Company.csv"), job.path("Student.csv"))
+            job.cache_key = cache.input_key(job.cache_files, cache.config_digest(), options)
+            entry = result_cache.get(job.cache_key) if use_cache else None
+        registry.inc("cache_requests_total", result="hit" if entry is not None else "miss")
+        job.phases = phases
 
-        script_path = "backend/solver2.py"
-        
-        # really important to add -u to allow real-time output
-        solver_proc = await asyncio.create_subprocess_shell(
-            f"python -u {script_path}", 
-            stdout=asyncio.subprocess.PIPE
-        )
+        if entry is not None:
+            result_cache.restore(job.cache_key, job.workspace)
+            job.load_cached(entry, options)
+            complete = entry["result"].get("status") == "OPTIMAL"
 
-        await solver_proc.wait()
-        
-        solver_proc = None
+            if complete or not continue_solve:
+                self.write(json.dumps({
+                    "result": "success", "msg": "Cached result", "job": job.id,
+                    "cached": True, "complete": complete,
+                }))
+                return
 
+            # the cached solution is the warm start of the continuation
+            options["warm_start"] = True
 
-class Solver_Kill_Handler(Base_Handler):
-    def post(self):
-        global solver_proc
-        if solver_proc is not None:
-            # on windows and macos it's sigint | sigterm
-            # possibly change to proc.terminate() for future version
+        scheduler.submit(job, options)
+        self.write(json.dumps({
+            "result": "success",
+            "msg": "Solver started" if job.status == "running" else "Solver queued",
+            "job": job.id,
+        }))
+
+
+class Reoptimize_Handler(Base_Handler):
+    """
+    keeps the current solution (out.json) except for the neighbourhood of
+    the pinned students and time slots, which is solved again in the worker
+    (reoptimize.py), the result streams like a solve
+    """
 
-            os.kill(solver_proc.pid, signal.SIGINT)
+    async def post(self, job_id=DEFAULT_JOB):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+
+        body = self.json_body()
+        if body is None:
+            return
+
+        if job.active:
+            self.write(json.dumps({"result": "err", "msg": "existing an ongoing solver"}))
+            return
+        for name in ("Student.csv", "Company.csv", "out.json"):
+            if not os.path.exists(job.path(name)):
+                self.write(json.dumps({
+                    "result": "err", "msg": f"{name} does not exist, please upload and solve first"
+                }))
+                return
+
+        try:
+            pins = {
+                "students": [[int(p["student"]), int(p["team"])] for p in body.get("locked", [])],
+                "slots": [[int(t), str(time)] for t, time in body.get("slots", {}).items()],
+            }
+            neighbours = int(body.get("neighbours", 4))
+            reoptimize_time = float(body.get("time", 5))
+            if neighbours < 0 or not reoptimize_time > 0:
+                raise ValueError
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self.bad_request(
+                'expected {"locked": [{"student": 3, "team": 5}, ...], '
+                '"slots": {"5": "<time slot>"}, "neighbours": 4, "time": 5}'
+            )
+            return
+        options = {k: v for k, v in body.items() if k in ("availability", "profile")}
+        error = option_error(options)
+        if error:
+            self.bad_request(error)
+            return
+
+        phases = metrics.Phases()
+        with phases.phase("verify_wait"):
+            verification_errors = await job.verify()
+        if job.active:
+            self.write(json.dumps({"result": "err", "msg": "existing an ongoing solver"}))
+            return
+        if verification_errors:
+            self.write(json.dumps({
+                "result": "err", "msg": f"Verification failed: {verification_errors[0]['msg']}",
+                "errors": verification_errors,
+            }))
+            return
+
+        options.update(
+            mode="reoptimize", pins=pins, neighbours=neighbours, reoptimize_time=reoptimize_time
+        )
+        # an edited solution is not the result of the files, it is not cached
+        job.cache_key = None
+        job.phases = phases
+        scheduler.submit(job, options)
+        self.write(json.dumps({
+            "result": "success",
+            "msg": "Re-optimization started" if job.status == "running" else "Re-optimization queued",
+            "job": job.id,
+        }))
+
+
+class Solver_Kill_Handler(Base_Handler):
+    def post(self, job_id=DEFAULT_JOB):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        if scheduler.cancel(job):
             self.write(json.dumps({"result": "success", "msg": "Solver Stopped"}))
         else:
             self.write(json.dumps({"result": "success", "msg": "No solver running"}))
-        
-        solver_proc = None
 
 
 class CSV_Output_Handler(Base_Handler):
-    def get(self):
+    async def get(self, job_id=DEFAULT_JOB):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        output_csv = job.path("out.csv")
         try:
             print(f"Start outputing CSV file from {output_csv}")
-            self.set_header("Content-Type", "text/csv")
-            self.set_header("Content-Disposition", "attachment; filename=\"output.csv\"")
-            with open(output_csv, 'r') as f:
-                self.write(f.read())
-            self.finish()
+            # out.csv is replaced by a rename, the open file stays this version
+            file = open(output_csv, "rb")
         except Exception as e:
             self.set_status(500)
             self.write(json.dumps({"result": "error", "msg": f"Error reading CSV file: {str(e)}"}))
+            return
+
+        with file:
+            stat = os.fstat(file.fileno())
+            self.set_header("Content-Type", "text/csv")
+            self.set_header("Content-Disposition", "attachment; filename=\"output.csv\"")
+            if self.not_modified("%x-%x" % (stat.st_mtime_ns, stat.st_size), stat.st_mtime):
+                return
+
+            compressor = None
+            if self.accepts_gzip():
+                self.set_header("Content-Encoding", "gzip")
+                compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            # sent in chunks, a large file is never held in memory
+            try:
+                for block in iter(lambda: file.read(DOWNLOAD_CHUNK), b""):
+                    self.write(compressor.compress(block) if compressor else block)
+                    await self.flush()
+                if compressor is not None:
+                    self.write(compressor.flush())
+                self.finish()
+            except tornado.iostream.StreamClosedError:
+                pass
+
+
+class Events_Handler(Base_Handler):
+    """
+    Server-Sent Events of a job, for any number of viewers: the current
+    solution as a snapshot event, then every improvement as a delta event
+    (see /matching), and a status event whenever the job status changes.
+    The stream stays open across solves, a new solve starts with a new
+    snapshot. Everything is sent from memory.
+    """
+
+    def send(self, event, record):
+        self.write(f"event: {event}\ndata: {json.dumps(record)}\n\n")
+
+    async def get(self, job_id=DEFAULT_JOB):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("Connection", "keep-alive")
+
+        solution = job.solution()
+        if solution is not None:
+            self.send("snapshot", solution)
+        generation, seq, status = job.state.generation, job.state.seq, None
+
+        try:
+            while True:
+                # a solve without its header yet has nothing to show
+                if job.state.header is not None:
+                    records = job.state.since(generation, seq)
+                    if records is None:
+                        records = [job.state.snapshot()]
+                    for record in records:
+                        self.send(record["type"], record)
+                generation, seq = job.state.generation, job.state.seq
+
+                if job.status != status:
+                    status = job.status
+                    self.send("status", job.info())
+
+                await self.flush()
+
+                # something may have changed while flushing
+                if (generation, seq, status) == (job.state.generation, job.state.seq, job.status):
+                    if not await job.changed.wait(timeout=KEEPALIVE):
+                        self.write(": keepalive\n\n")
+
+        except tornado.iostream.StreamClosedError:
+            pass
 
 
 class MatchHandler(Base_Handler):
-    def get(self):
-        if os.path.exists(RES_FILE):
-            with open(RES_FILE, 'r') as file:
-                data = json.load(file)
-                self.write(data)
-        else:
-            self.write({
-                "students": [],
-                "projects": [],
-                "skills": {},
-                "matching": {}
-            })
+    def get(self, job_id=DEFAULT_JOB):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        # unchanged polls get a 304, the body is serialized once per solution
+        tag, modified, body = job.result_json()
+        if self.not_modified(tag, modified):
+            return
+        if self.accepts_gzip():
+            self.set_header("Content-Encoding", "gzip")
+            body = job.result_gzip()
+        self.write(body)
 
-    def post(self):
+    def post(self, job_id=DEFAULT_JOB):
+        job = self.get_job(job_id)
+        if job is None:
+            return
         data = json.loads(self.request.body)
-        with open(RES_FILE, 'w') as file:
+        with open(job.path("out.json"), 'w') as file:
             json.dump(data, file)
+        # viewers follow the edited solution too
+        if all(k in data for k in ("students", "projects", "skills")):
+            job.state.apply({"type": "snapshot", **data})
+            job.changed.notify_all()
         self.write({"status": "success"})
 
 
+class Jobs_Handler(Base_Handler):
+    def get(self):
+        self.write(json.dumps([job.info() for job in scheduler.jobs.values()]))
+
+    def post(self):
+        # a new job with an empty workspace, upload its files next
+        job = scheduler.create()
+        self.write(json.dumps({"result": "success", "job": job.id}))
+
+
+class Job_Status_Handler(Base_Handler):
+    def get(self, job_id):
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        self.write(json.dumps(job.info()))
+
+
+class Metrics_Handler(Base_Handler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        for status in ("idle", "queued", "running", "finished", "cancelled", "failed"):
+            registry.set(
+                "jobs", sum(job.status == status for job in scheduler.jobs.values()), status=status
+            )
+        self.write(registry.render())
+
+
+def log_request(handler):
+    # replaces the tornado access log, which is not shown anyway
+    registry.observe(
+        "request_seconds", handler.request.request_time(),
+        handler=type(handler).__name__, status=handler.get_status(),
+    )
+
+
 def make_app():
     return tornado.web.Application([
         (r"/match", MatchHandler),
@@ -220,8 +983,21 @@ def make_app():
         # (r"/action/delete_match"),
         (r"/action/solve", Alloc_Solve_Handler),
         (r"/action/kill", Solver_Kill_Handler),
+        (r"/action/reoptimize", Reoptimize_Handler),
         (r"/action/output-csv", CSV_Output_Handler),
-    ])
+        (r"/events", Events_Handler),
+        (r"/jobs", Jobs_Handler),
+        (r"/jobs/(\w+)", Job_Status_Handler),
+        (r"/jobs/(\w+)/upload", Upload_File_Handler),
+        (r"/jobs/(\w+)/solve", Alloc_Solve_Handler),
+        (r"/jobs/(\w+)/stream", Current_Alloc_Handler),
+        (r"/jobs/(\w+)/events", Events_Handler),
+        (r"/jobs/(\w+)/cancel", Solver_Kill_Handler),
+        (r"/jobs/(\w+)/reoptimize", Reoptimize_Handler),
+        (r"/jobs/(\w+)/result", MatchHandler),
+        (r"/jobs/(\w+)/result.csv", CSV_Output_Handler),
+        (r"/metrics", Metrics_Handler),
+    ], log_function=log_request)
 
 
 if __name__ == "__main__":
@@ -233,15 +1009,19 @@ if __name__ == "__main__":
     
     # The chmod problem was mainly caused by opening files in other apps, just don't do that
 
-    # Initialize the output file with empty data structure
-    with open(RES_FILE, 'w') as file:
-        json.dump({
-            "students": [],
-            "projects": [],
-            "skills": {},
-            "matching": {}
-        }, file)
+    # Initialize the output file with empty data structure, an existing
+    # result is kept so it can still be shown and used to warm start
+    if not os.path.exists(RES_FILE):
+        with open(RES_FILE, 'w') as file:
+            json.dump({
+                "students": [],
+                "projects": [],
+                "skills": {},
+                "matching": {}
+            }, file)
 
     application = make_app()
     application.listen(8888)
+
+    tornado.ioloop.IOLoop.current().spawn_callback(scheduler.start)
     tornado.ioloop.IOLoop.instance().start()
@@ -0,0 +1,90 @@
+"""
+Timing instrumentation of the solve pipeline.
+
+Phases collects the durations and sizes (rows, variables, constraints,
+bytes written, ...) of one solve or verification, the worker attaches them
+to its {"type": "done"} record. Registry accumulates them in the server and
+renders them in the Prometheus text format for /metrics.
+"""
+import contextlib
+import time
+from collections import defaultdict
+
+
+class Phases:
+    """durations (seconds) and sizes of the phases of one run"""
+
+    def __init__(self):
+        self.durations = {}
+        self.sizes = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0) + seconds
+
+    def size(self, **sizes):
+        self.sizes.update(sizes)
+
+    def summary(self):
+        return {
+            "phases": {k: round(v, 6) for k, v in self.durations.items()},
+            "sizes": dict(self.sizes),
+        }
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Registry:
+    """counters, gauges and summaries (sum and count) with labels"""
+
+    def __init__(self, prefix="cap25"):
+        self.prefix = prefix
+        self.kinds = {}
+        self.help = {}
+        self.values = defaultdict(float)
+
+    def describe(self, name, kind, help):
+        self.kinds[name] = kind
+        self.help[name] = help
+
+    def inc(self, name, value=1, **labels):
+        self.values[name, tuple(sorted(labels.items()))] += value
+
+    def set(self, name, value, **labels):
+        self.values[name, tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[name + "_sum", key] += value
+        self.values[name + "_count", key] += 1
+
+    def observe_phases(self, summary, **labels):
+        # a Phases.summary() of a solve or verification
+        for phase, seconds in summary.get("phases", {}).items():
+            self.observe("phase_seconds", seconds, phase=phase, **labels)
+        for item, value in summary.get("sizes", {}).items():
+            self.set("last_size", value, item=item, **labels)
+
+    def render(self):
+        lines = []
+        for name in sorted(self.kinds):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full} {self.help[name]}")
+            lines.append(f"# TYPE {full} {self.kinds[name]}")
+            suffixes = ["_sum", "_count"] if self.kinds[name] == "summary" else [""]
+            for (key, labels), value in sorted(self.values.items()):
+                for suffix in suffixes:
+                    if key == name + suffix:
+                        lines.append(f"{full}{suffix}{format_labels(labels)} {value:.15g}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,152 @@
+"""
+Local re-optimization of a solution after manual edits ("mode": "reoptimize").
+
+The solution of the workspace (out.json, hand edits posted to /match
+included) is kept except for a neighbourhood around the edits: the teams
+of the pinned students (the one they are pinned to and the one they are
+in), the teams with a pinned time slot, the teams the edits left invalid
+(size, availability, a student in two teams) and the `neighbours` teams
+with the most similar requirements. Only that neighbourhood is solved
+again (decompose.solve_model on data.subset), with the pins as
+constraints, so a change answers in seconds on any cohort size.
+
+pins (the indices of the students and projects lists of out.json):
+
+    {"students": [[student, team], ...], "slots": [[team, "MW 1:30-3:00"], ...]}
+"""
+import sys
+import numpy as np
+from ortools.sat.python import cp_model
+import solver2
+import decompose
+import metrics
+
+DEFAULT_OPTIONS = {
+    "pins": {"students": [], "slots": []},
+    # similar teams solved together with the edited ones
+    "neighbours": 4,
+    # seconds for the neighbourhood
+    "reoptimize_time": 5,
+}
+
+
+def map_pins(data, solution, pins):
+    """the pins in data indices, ValueError for unknown students, teams or slots"""
+    students, teams = solver2.solution_indices(data, solution)
+    slot_idx = {time: j for j, time in enumerate(solver2.AVA_LST)}
+    try:
+        student_pins = [(students[int(i)], teams[int(t)]) for i, t in pins.get("students", [])]
+        slot_pins = [(teams[int(t)], slot_idx[time]) for t, time in pins.get("slots", [])]
+    except (IndexError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"invalid pin: {e}")
+    if any(i < 0 or t < 0 for i, t in student_pins) or any(t < 0 for t, _ in slot_pins):
+        raise ValueError("a pin refers to a student or project that is not in the uploaded files")
+    return student_pins, slot_pins
+
+
+def invalid_teams(data, x, slots):
+    """teams whose size, time slot or availability the edits broke"""
+    size = x.sum(axis=0)
+    no_slot = slots < 0
+    unavailable = (x * (data.np_available[:, np.maximum(slots, 0)] == 0)).any(axis=0)
+    return np.flatnonzero(
+        (size < solver2.GRP_SIZ["min"]) | (size > solver2.GRP_SIZ["max"]) | no_slot | unavailable
+    )
+
+
+def neighbourhood(data, x, slots, student_pins, slot_pins, n_neighbours):
+    """the teams and students solved again, the rest of x stays"""
+    edited = {t for _, t in student_pins} | {t for t, _ in slot_pins}
+    for i, _ in student_pins:
+        edited.update(np.flatnonzero(x[i]).tolist())
+    # students in two teams
+    for i in np.flatnonzero(x.sum(axis=1) > 1):
+        edited.update(np.flatnonzero(x[i]).tolist())
+    edited.update(invalid_teams(data, x, slots).tolist())
+    if not edited:
+        # nothing pinned or broken, improve the weakest team
+        edited.add(int(solver2.team_goodness_values(data, x).argmin()))
+
+    edited = np.array(sorted(edited), dtype=int)
+    # the closest requirements, measured like decompose.cluster_teams
+    points = data.coefficients / data.coefficients.sum(axis=1, keepdims=True)
+    distance = ((points[:, None, :] - points[None, edited, :]) ** 2).sum(axis=2).min(axis=1)
+    distance[edited] = np.inf
+    others = np.argsort(distance, kind="stable")[: min(n_neighbours, data.n_teams - len(edited))]
+    teams = np.concatenate([edited, others]).astype(int)
+
+    pinned = [i for i, _ in student_pins]
+    students = np.flatnonzero(x[:, teams].any(axis=1) | (x.sum(axis=1) == 0))
+    students = np.union1d(students, np.array(pinned, dtype=int))
+    return students, teams
+
+
+def solve(data, previous, options, publish, solver=None, phases=None, limits=None):
+    """
+    re-solves the neighbourhood of the pins in the previous solution and
+    publishes the result, returns the status name
+    """
+    options = {**DEFAULT_OPTIONS, **options}
+    phases = phases or metrics.Phases()
+    solver = solver or cp_model.CpSolver()
+
+    matrix = solver2.solution_matrix(data, previous) if previous is not None else None
+    if matrix is None:
+        print("reoptimize: out.json does not fit the uploaded files, solve first", file=sys.stderr)
+        return "MODEL_INVALID"
+    x, slots = matrix
+    student_pins, slot_pins = map_pins(data, previous, options["pins"])
+
+    # the edited solution is what the viewers had, it stays shown until the
+    # neighbourhood is solved
+    publish(*solver2.solution_to_json(x, slots))
+
+    students, teams = neighbourhood(
+        data, x, slots, student_pins, slot_pins, options["neighbours"]
+    )
+    phases.size(neighbourhood_teams=len(teams), neighbourhood_students=len(students))
+    print(f"reoptimize: {len(teams)} teams, {len(students)} students", file=sys.stderr)
+
+    student_pos = {int(i): k for k, i in enumerate(students)}
+    team_pos = {int(t): k for k, t in enumerate(teams)}
+    sub_pins = (
+        [(student_pos[i], team_pos[t]) for i, t in student_pins],
+        [(team_pos[t], j) for t, j in slot_pins],
+    )
+
+    # the hint is the edited solution with the pins applied
+    sub_x = x[np.ix_(students, teams)].copy()
+    sub_slots = np.maximum(slots[teams], 0)
+    for i, t in sub_pins[0]:
+        sub_x[i] = 0
+        sub_x[i, t] = 1
+    for t, j in sub_pins[1]:
+        sub_slots[t] = j
+
+    time_limit = options["reoptimize_time"]
+    if limits is not None:
+        time_limit = limits.time_for(time_limit)
+    num_workers = options["num_workers"] or 1
+    # the pins usually break the hint (a team one student short), without
+    # repair CP-SAT drops it and starts from scratch
+    solver.parameters.repair_hint = True
+    with phases.phase("reoptimize"):
+        result = decompose.solve_model(
+            data.subset(students, teams), options, time_limit, num_workers,
+            hint=(sub_x, sub_slots), solver=solver, pins=sub_pins,
+        )
+    if result is None:
+        status = solver.ResponseProto().status
+        print("reoptimize: no solution with these pins, try more neighbours", file=sys.stderr)
+        return "INFEASIBLE" if status == cp_model.INFEASIBLE else "UNKNOWN"
+
+    before = solver2.objective_value(data, x) if len(invalid_teams(data, x, slots)) == 0 else None
+    x = x.copy()
+    x[students] = 0
+    x[np.ix_(students, teams)] = result[0]
+    slots = slots.copy()
+    slots[teams] = result[1]
+    publish(*solver2.solution_to_json(x, slots))
+    print(f"reoptimize: objective {before} -> {solver2.objective_value(data, x)}", file=sys.stderr)
+    # the rest of the cohort was not searched
+    return "FEASIBLE"
@@ -3,8 +3,8 @@ import numpy as np
 from ortools.sat.python import cp_model
 import numpy as np
 import os
-import json
-import csv
+import stream
+import writer
 
 BASE_DIR = "files/"
 
@@ -37,26 +37,19 @@ n_teams = np_companies.shape[0]
 
 skill_num_to_name = {i: skill for i, skill in enumerate(df_students.columns[2:])}
 
-students = []
-for index, row in df_students.iterrows():
-    student = {
-        "name": row["Name"],
-        "eid": row["EID"],
-        "skill_set": {
-            str(i): float(row[skill]) for i, skill in skill_num_to_name.items()
-        },
-    }
-    students.append(student)
-
-projects = []
-for index, row in df_companies.iterrows():
-    project = {
-        "name": row["Project_ID"],
-        "skill_req": {
-            str(i): float(row[skill]) for i, skill in skill_num_to_name.items()
-        },
-    }
-    projects.append(project)
+keys = [str(i) for i in skill_num_to_name]
+
+students = [
+    {"name": name, "eid": eid, "skill_set": dict(zip(keys, skill_set))}
+    for name, eid, skill_set in zip(
+        df_students["Name"].tolist(), df_students["EID"].tolist(), np_students.astype(float).tolist()
+    )
+]
+
+projects = [
+    {"name": name, "skill_req": dict(zip(keys, skill_req))}
+    for name, skill_req in zip(df_companies["Project_ID"].tolist(), np_companies.astype(float).tolist())
+]
 
 # setting up model constraints and objective
 
@@ -125,20 +118,20 @@ class TeamFormationCallback(cp_model.CpSolverSolutionCallback):
                 "matching": parsed_assignment,
             }
 
-            # output to stdout
-            print(json.dumps(output))
+            # output to stdout, only the teams that changed
+            emitter.emit(parsed_assignment)
+
+            # output to files, on the writer thread
+            result_writer.submit(output)
 
-            # output to files
-            with open(OUTPUT_PATH, "w") as file:
-                json.dump(output, file, ensure_ascii=False, indent=2)
 
-            with open(OUTPUT_CSV, "w", newline="") as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(["Team", "Student Names"])
-                for t, s in parsed_assignment.items():
-                    team_name = projects[t]["name"]
-                    student_names = [students[i]["name"] for i in s]
-                    writer.writerow([team_name, *student_names])
+def csv_rows(output):
+    rows = [["Team", "Student Names"]]
+    for t, s in output["matching"].items():
+        team_name = output["projects"][t]["name"]
+        student_names = [output["students"][i]["name"] for i in s]
+        rows.append([team_name, *student_names])
+    return rows
 
 
 # Solve the model.
@@ -148,6 +141,14 @@ solver.log_callback = print
 solver.parameters.max_time_in_seconds = 60 * 5
 solver.parameters.num_search_workers = max(os.cpu_count() - 1, 1)
 
+emitter = stream.SolutionEmitter(students, projects, skill_num_to_name)
+emitter.header()
+
+result_writer = writer.ResultWriter(OUTPUT_PATH, OUTPUT_CSV, csv_rows)
+
 solution_callback = TeamFormationCallback(assignment=assignment)
 
-status = solver.SolveWithSolutionCallback(model, callback=solution_callback)
+try:
+    status = solver.SolveWithSolutionCallback(model, callback=solution_callback)
+finally:
+    result_writer.close()
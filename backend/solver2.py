@@ -2,10 +2,21 @@ import pandas as pd
 import numpy as np
 from ortools.sat.python import cp_model
 import os
+import sys
 import json
-import csv
+import argparse
+import hashlib
+import inspect
+import tempfile
+import threading
+import time
 from fractions import Fraction
+from importlib import metadata
 from itertools import product
+import stream
+import writer
+import metrics
+import ingest
 
 BASE_DIR = "files/"
 
@@ -14,6 +25,9 @@ OUTPUT_CSV = BASE_DIR + "out.csv"
 COMP_PATH = BASE_DIR + "Company.csv"
 STUD_PATH = BASE_DIR + "Student.csv"
 
+# built models, reused while the data and the formulation do not change
+MODEL_CACHE_DIR = BASE_DIR + "models/"
+
 CONFIG_FILE = "config.json"
 
 with open(CONFIG_FILE) as f:
@@ -23,6 +37,7 @@ with open(CONFIG_FILE) as f:
     IMP_MAP = config["skill_importance"]
     AVA_LST = config["time_avaliability"]
     GRP_SIZ = config["group_size"]
+    MODEL_CACHE_BYTES = config.get("cache", {}).get("model_max_bytes", 1024 ** 3)
 
 STU_MAP = {int(k): v for k, v in STU_MAP.items()}
 COM_MAP = {int(k): v for k, v in COM_MAP.items()}
@@ -30,6 +45,58 @@ IMP_MAP = {k: Fraction(v) for k, v in IMP_MAP.items()}
 
 np.set_printoptions(threshold=np.inf)
 
+# weight of the minimum team goodness in the objective
+MIN_WEIGHT = 1000000
+
+# options of a single solve, the worker receives them with every job and
+# the command line below maps onto them
+DEFAULT_OPTIONS = {
+    # aggregated: one constraint per (team, slot) forbidding all unavailable students
+    # pairwise:   one clause per (student, team, slot) where the student is unavailable
+    # full:       the original implication for every (student, team, slot)
+    "availability": "aggregated",
+    # CP-SAT search workers, None for all cores but one
+    "num_workers": None,
+    # hint the search with the previous out.json, students are matched by
+    # EID and projects by Project_ID so the input files may have changed
+    "warm_start": False,
+    # monolithic: one CP-SAT model for the whole cohort
+    # decompose:  split into pieces solved in parallel, then repaired (decompose.py)
+    # reoptimize: the previous solution with pinned assignments, only the
+    #             neighbourhood of the pins solved again (reoptimize.py)
+    "mode": "monolithic",
+    # publish a greedy + local search solution (heuristic.py) before CP-SAT
+    # starts and use it as the hint, heuristic_time bounds the local search
+    "heuristic": True,
+    "heuristic_time": 0.2,
+    # load the model from MODEL_CACHE_DIR instead of building it again
+    "model_cache": True,
+    # auto:   model identical students as classes with a count per team
+    #         (compress.py) when the cohort has any
+    # always: the compressed model even without identical students
+    # never:  one boolean per student and team
+    "compress": "auto",
+    # weighted:      maximize sum(team_goodness) + MIN_WEIGHT * min_goodness
+    # lexicographic: maximize min_goodness first (at most min_time seconds),
+    #                then sum(team_goodness) with min_goodness kept at its
+    #                best value (at most total_time seconds), None for no limit
+    "objective": "weighted",
+    "min_time": None,
+    "total_time": None,
+    # layout of the students and projects in the stream header and out.json,
+    # rows: a dict per student / project, columns: lists and skill matrices
+    "payload": "rows",
+    # stop rules (SolveLimits), None for none: wall clock seconds of the
+    # whole solve, relative gap between the incumbent and the best bound,
+    # seconds without an improving solution
+    "time_limit": None,
+    "gap": None,
+    "plateau": None,
+    # CP-SAT parameter profile, a name of config.json solver.profiles (None
+    # for solver.profile) or the parameters themselves (tune.py)
+    "profile": None,
+}
+
 
 def lcm(xs):
 
@@ -45,135 +112,552 @@ def lcm(xs):
         return xs[0] * temp // gcd(xs[0], temp)
 
 
-if os.path.exists(OUTPUT_PATH):
-    os.remove(OUTPUT_PATH)
-
-df_companies = pd.read_csv(COMP_PATH)
-df_students = pd.read_csv(STUD_PATH)
-
-# get numpy array dimensions
-np_companies = df_companies.iloc[:, 3:].astype(int).to_numpy()
-np_students = df_students.iloc[:, 2 + len(AVA_LST):].astype(int).to_numpy()
-np_available = df_students.iloc[:, 2:2 + len(AVA_LST)].astype(int).to_numpy()
-
-# map company and student skill to updated values
-np_companies = np.vectorize(COM_MAP.get)(np_companies)
-np_students = np.vectorize(STU_MAP.get)(np_students)
-
-
-# scale the company skill importance by the mapping
-
-scale_factor = lcm([v.denominator for v in IMP_MAP.values()])
-np_companies *= scale_factor
-
-for i, imp in IMP_MAP.items():
-    # get the index of column of the df companies
-    col_idx = df_companies.columns.get_loc(i) - 3
-    np_companies[:, col_idx] //= imp.denominator
-    np_companies[:, col_idx] *= imp.numerator
-
-n_students, n_skills = np_students.shape
-n_teams = np_companies.shape[0]
-
-
-# format some data for output
-
-skill_num_to_name = {
-    i: skill for i, skill in enumerate(df_students.columns[2 + len(AVA_LST) :])
-}
-
-students = []
-for index, row in df_students.iterrows():
-    student = {
-        "name": row["Name"],
-        "eid": row["EID"],
-        "skill_set": {
-            str(i): STU_MAP[int(row[skill])] for i, skill in skill_num_to_name.items()
-        },
-    }
-    students.append(student)
-
-projects = []
-for index, row in df_companies.iterrows():
-    project = {
-        "name": row["Project_ID"],
-        "skill_req": {
-            str(i): float((COM_MAP[int(row[skill])] * (1 if skill not in IMP_MAP.keys() else IMP_MAP[skill]))) for i, skill in skill_num_to_name.items()
-        },
-    }
-    projects.append(project)
-
-# setting up model constraints and objective
-
-model = cp_model.CpModel()
-
-# Decision variables: assignment[i, t] is True if student i is assigned to team t.
-
-# Create a numpy array to store assignment variables
-assignment = np.empty((n_students, n_teams), dtype=object)
-
-for i, t in product(range(n_students), range(n_teams)):
-    assignment[i, t] = model.NewBoolVar(f"assign_s{i}_t{t}")
-
-time_slot = np.empty((n_teams, len(AVA_LST)), dtype=object)
-for t, (i, time) in product(range(n_teams), enumerate(AVA_LST)):
-    time_slot[t, i] = model.NewBoolVar(f"slot_t{t}_time{time}")
-
-# a team has to have 1 time slot available
-for t in range(n_teams):
-    model.Add(sum(time_slot[t, :]) == 1)
-
-# if a student is assigned to a team where the time is not available to him,
-# if student is added to a time slot unavailable to him, then add penalty to the team goodness
-
-for i, t, (j, time) in product(range(n_students), range(n_teams), enumerate(AVA_LST)):
-    model.AddImplication(time_slot[t, j], np_available[i, j]).OnlyEnforceIf(
-        assignment[i, t]
+def map_ratings(ratings, mapping):
+    """the mapped value of every rating, through a lookup table"""
+    low = min(mapping)
+    table = np.zeros(max(mapping) - low + 1, dtype=np.int64)
+    for rating, value in mapping.items():
+        table[rating - low] = value
+    return table[ratings - low]
+
+
+class Dataset:
+    """the parsed input files, everything the model and the output need"""
+
+    def __init__(self, df_companies, df_students):
+        self.build(
+            company_ratings=df_companies.iloc[:, 3:].astype(int).to_numpy(),
+            student_ratings=df_students.iloc[:, 2 + len(AVA_LST):].astype(int).to_numpy(),
+            available=df_students.iloc[:, 2:2 + len(AVA_LST)].astype(int).to_numpy(),
+            project_ids=df_companies["Project_ID"].tolist(),
+            student_names=df_students["Name"].tolist(),
+            student_eids=df_students["EID"].tolist(),
+            skills=list(df_students.columns[2 + len(AVA_LST):]),
+            company_skills=list(df_companies.columns[3:]),
+        )
+
+    @classmethod
+    def from_ingest(cls, meta, arrays):
+        """the dataset of an ingest (ingest.load), without parsing the files"""
+        data = cls.__new__(cls)
+        data.build(
+            company_ratings=arrays["company_ratings"],
+            student_ratings=arrays["student_ratings"],
+            available=arrays["available"],
+            project_ids=arrays["project_ids"].tolist(),
+            student_names=arrays["student_names"].tolist(),
+            student_eids=arrays["student_eids"].tolist(),
+            skills=meta["skills"],
+            company_skills=meta["company_skills"],
+        )
+        return data
+
+    def build(
+        self, company_ratings, student_ratings, available, project_ids, student_names,
+        student_eids, skills, company_skills,
+    ):
+        self.np_available = np.asarray(available, dtype=int)
+
+        # map company and student skill to updated values
+        company_ratings = np.asarray(company_ratings, dtype=int)
+        np_companies = map_ratings(company_ratings, COM_MAP)
+        self.np_students = map_ratings(np.asarray(student_ratings, dtype=int), STU_MAP)
+
+        # scale the company skill importance by the mapping
+
+        scale_factor = lcm([v.denominator for v in IMP_MAP.values()])
+        np_companies *= scale_factor
+
+        for i, imp in IMP_MAP.items():
+            # get the index of column of the company skills
+            col_idx = company_skills.index(i)
+            np_companies[:, col_idx] //= imp.denominator
+            np_companies[:, col_idx] *= imp.numerator
+
+        self.np_companies = np_companies
+
+        self.n_students, self.n_skills = self.np_students.shape
+        self.n_teams = self.np_companies.shape[0]
+
+        # a team's goodness is min over the skills of
+        # sum(student skill) * coefficients[t, skill]
+        # python integers, an int64 lcm could overflow silently
+        self.global_factor = lcm(np.unique(self.np_companies).tolist())
+        self.coefficients = self.global_factor // self.np_companies
+
+        # data for output, one entry per student / project, see payload()
+
+        self.skill_num_to_name = dict(enumerate(skills))
+        self.student_names = list(student_names)
+        self.student_eids = list(student_eids)
+        self.project_ids = list(project_ids)
+
+        # the requirement of every rating and skill, exact like
+        # float(mapped rating * importance) of each cell
+        low = min(COM_MAP)
+        requirements = np.array([
+            [float(COM_MAP.get(r, 0) * IMP_MAP.get(skill, 1)) for r in range(low, max(COM_MAP) + 1)]
+            for skill in skills
+        ]).reshape(len(skills), -1)
+        self.skill_req = requirements[np.arange(len(skills)), company_ratings - low]
+
+    def payload(self, layout="rows"):
+        """
+        the students and projects of the output. rows: a list with a dict
+        per student / project (skill_set and skill_req keyed by the skill
+        index as a string), columns: a dict of lists, skill_set and
+        skill_req as (students | projects, skills) matrices
+        """
+        if layout == "columns":
+            return (
+                {"name": self.student_names, "eid": self.student_eids,
+                 "skill_set": self.np_students.tolist()},
+                {"name": self.project_ids, "skill_req": self.skill_req.tolist()},
+            )
+
+        keys = [str(i) for i in range(self.n_skills)]
+        students = [
+            {"name": name, "eid": eid, "skill_set": dict(zip(keys, skill_set))}
+            for name, eid, skill_set in zip(
+                self.student_names, self.student_eids, self.np_students.tolist()
+            )
+        ]
+        projects = [
+            {"name": name, "skill_req": dict(zip(keys, skill_req))}
+            for name, skill_req in zip(self.project_ids, self.skill_req.tolist())
+        ]
+        return students, projects
+
+    def subset(self, student_idx, team_idx):
+        """
+        the dataset restricted to some students and teams, the coefficients
+        of the full dataset are kept so goodness values stay comparable
+        """
+        sub = Dataset.__new__(Dataset)
+        sub.np_students = self.np_students[student_idx]
+        sub.np_available = self.np_available[student_idx]
+        sub.np_companies = self.np_companies[team_idx]
+        sub.n_students, sub.n_skills = sub.np_students.shape
+        sub.n_teams = sub.np_companies.shape[0]
+        sub.global_factor = self.global_factor
+        sub.coefficients = self.coefficients[team_idx]
+        sub.skill_num_to_name = self.skill_num_to_name
+        sub.student_names = [self.student_names[i] for i in student_idx]
+        sub.student_eids = [self.student_eids[i] for i in student_idx]
+        sub.project_ids = [self.project_ids[t] for t in team_idx]
+        sub.skill_req = self.skill_req[team_idx]
+        return sub
+
+
+def goodness_bounds(data):
+    """
+    (scale, lower, upper) of the model goodness: scale is the common factor
+    of every student rating times coefficient, the model works with the
+    skill sums divided by it, which keeps the order of all solutions.
+    lower and upper bound the scaled goodness of every team: its weakest
+    and strongest possible members for every skill
+    """
+    scale = int(np.gcd.reduce(data.np_students, axis=None)) * int(
+        np.gcd.reduce(data.coefficients, axis=None)
+    ) or 1
+
+    # exact python integers, the check below is about int64 overflow
+    ordered = np.sort(data.np_students, axis=0).astype(object)
+    coefficients = data.coefficients.astype(object)
+    lower = (ordered[:GRP_SIZ["min"]].sum(axis=0) * coefficients).min(axis=1) // scale
+    upper = (ordered[-GRP_SIZ["max"]:].sum(axis=0) * coefficients).min(axis=1) // scale
+
+    largest = max(
+        int(upper.sum()) + MIN_WEIGHT * int(upper.min()),
+        int(ordered[-GRP_SIZ["max"]:].sum(axis=0).max()) * int(coefficients.max()) // scale,
     )
+    if largest > np.iinfo(np.int64).max:
+        raise ValueError(
+            f"goodness values up to {largest} do not fit in 64 bits, "
+            "use fewer decimals in skill_importance"
+        )
+    return scale, lower.astype(np.int64), upper.astype(np.int64)
+
+
+def team_goodness_values(data, x):
+    """
+    goodness of every team for a 0/1 (n_students, n_teams) assignment matrix,
+    the same value the model computes for team_goodness
+    """
+    return ((x.T @ data.np_students) * data.coefficients).min(axis=1)
+
+
+def objective_value(data, x):
+    goodness = team_goodness_values(data, x)
+    return int(goodness.sum() + MIN_WEIGHT * goodness.min())
+
+
+def load_data(comp_path=COMP_PATH, stud_path=STUD_PATH, phases=None):
+    """the dataset of the files, from their ingest (ingest.py) when there is one"""
+    phases = phases or metrics.Phases()
+    with phases.phase("read_dataset"):
+        ingested = ingest.load(comp_path, stud_path)
+    if ingested is not None:
+        with phases.phase("dataset"):
+            data = Dataset.from_ingest(*ingested)
+    else:
+        with phases.phase("read_csv"):
+            df_companies, df_students = pd.read_csv(comp_path), pd.read_csv(stud_path)
+        with phases.phase("dataset"):
+            data = Dataset(df_companies, df_students)
+    phases.size(students=data.n_students, teams=data.n_teams, skills=data.n_skills)
+    return data
 
 
-# setting up constraints of one student can only be assigned to one team
-for i in range(n_students):
-    model.Add(sum(assignment[i, :]) == 1)
-
-# setting up constraints of team size
-for t in range(n_teams):
-    model.Add(sum(assignment[:, t]) >= GRP_SIZ['min'])
-    model.Add(sum(assignment[:, t]) <= GRP_SIZ['max'])
-
-# setting up constraints of team goodness
-
-# team_goodness = {}
-# for t in range(n_teams):
-#     team_goodness[t] = model.NewIntVar(0, 1000000, f"team_goodness_{t}")
-#     model.Add(team_goodness[t] == np.dot(affinity_matrix[t, :], assignment[:, t]))
-
-
-global_factor = lcm(np.unique(np_companies))
-
-team_goodness = np.empty(n_teams, dtype=object)
-for t in range(n_teams):
-    team_goodness[t] = model.NewIntVar(0, 1000000, f"team_goodness_{t}")
-    skills = global_factor // np_companies[t, :]
-    sum_skill = assignment[:, t] @ np_students * skills
+# a student can not be assigned to a team meeting at a time unavailable to him
+def add_availability_constraints(model, assignment, time_slot, available, formulation):
+    n_students, n_teams = assignment.shape
+
+    if formulation == "full":
+        for i, t, j in product(range(n_students), range(n_teams), range(available.shape[1])):
+            model.AddImplication(time_slot[t, j], available[i, j]).OnlyEnforceIf(
+                assignment[i, t]
+            )
+        return
+
+    # students available at a slot never restrict it, so only the
+    # unavailable (student, slot) pairs produce constraints
+    for j in range(available.shape[1]):
+        unavailable = np.flatnonzero(available[:, j] == 0)
+        if len(unavailable) == 0:
+            continue
+
+        for t in range(n_teams):
+            if formulation == "aggregated":
+                model.Add(cp_model.LinearExpr.Sum(list(assignment[unavailable, t])) == 0).OnlyEnforceIf(
+                    time_slot[t, j]
+                )
+            else:
+                for i in unavailable:
+                    model.AddBoolOr([assignment[i, t].Not(), time_slot[t, j].Not()])
+
+
+class TeamModel:
+    """the CP-SAT model of a dataset together with its decision variables"""
+
+    def __init__(self, data, options):
+        n_students, n_teams = data.n_students, data.n_teams
+
+        # setting up model constraints and objective
+
+        model = self.model = cp_model.CpModel()
+
+        # Decision variables: assignment[i, t] is True if student i is assigned to team t.
+
+        # Create a numpy array to store assignment variables
+        assignment = self.assignment = np.empty((n_students, n_teams), dtype=object)
+
+        for i, t in product(range(n_students), range(n_teams)):
+            assignment[i, t] = model.NewBoolVar(f"assign_s{i}_t{t}")
+
+        time_slot = self.time_slot = np.empty((n_teams, len(AVA_LST)), dtype=object)
+        for t, (i, time) in product(range(n_teams), enumerate(AVA_LST)):
+            time_slot[t, i] = model.NewBoolVar(f"slot_t{t}_time{time}")
+
+        # a team has to have 1 time slot available
+        for t in range(n_teams):
+            model.Add(sum(time_slot[t, :]) == 1)
+
+        add_availability_constraints(model, assignment, time_slot, data.np_available, options["availability"])
+
+        # setting up constraints of one student can only be assigned to one team
+        for i in range(n_students):
+            model.Add(sum(assignment[i, :]) == 1)
+
+        # setting up constraints of team size
+        for t in range(n_teams):
+            model.Add(sum(assignment[:, t]) >= GRP_SIZ['min'])
+            model.Add(sum(assignment[:, t]) <= GRP_SIZ['max'])
+
+        # setting up constraints of team goodness
+
+        # the goodness is divided by scale, within bounds computed from the data
+        self.scale, lower, upper = goodness_bounds(data)
+
+        team_goodness = self.team_goodness = np.empty(n_teams, dtype=object)
+        for t in range(n_teams):
+            team_goodness[t] = model.NewIntVar(int(lower[t]), int(upper[t]), f"team_goodness_{t}")
+            skills = data.coefficients[t, :]
+            sum_skill = assignment[:, t] @ (data.np_students * skills // self.scale)
+
+            model.AddMinEquality(team_goodness[t], sum_skill)
+
+        min_goodness = self.min_goodness = model.NewIntVar(
+            int(lower.min()), int(upper.min()), "min_goodness"
+        )
+
+        model.AddMinEquality(min_goodness, team_goodness)
+
+        # this is the place of defining the big objective function
+        # Objective: maximize the minimum team goodness.
+        # as tested this could speed up the solver and
+        # give better result for minimum team goodness
+        # compared to just maximizing the minimum team goodness
+        model.Maximize(sum(team_goodness) + MIN_WEIGHT * min_goodness)
+
+    def save(self, path):
+        """path.npz holds the proto index of every variable, path.pb the model"""
+        def index(variables):
+            return np.vectorize(lambda v: v.Index(), otypes=[np.int64])(variables)
+
+        # the .pb is renamed into place last, it marks a complete entry
+        for suffix, write in (
+            (".npz", lambda file: np.savez(
+                file,
+                assignment=index(self.assignment),
+                time_slot=index(self.time_slot),
+                team_goodness=index(self.team_goodness),
+                min_goodness=self.min_goodness.Index(),
+                scale=self.scale,
+            )),
+            (".pb", lambda file: file.write(self.model.Proto().SerializeToString())),
+        ):
+            # a temp file of its own, two workers may save the same model
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path) or ".",
+                prefix=f".{os.path.basename(path)}{suffix}.", suffix=".tmp",
+            )
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    write(file)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path + suffix)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+    @classmethod
+    def load(cls, path):
+        team_model = cls.__new__(cls)
+        model = team_model.model = cp_model.CpModel()
+        with open(path + ".pb", "rb") as file:
+            model.Proto().ParseFromString(file.read())
+        # the python side variable objects, as CpModel.clone() does
+        model.rebuild_var_and_constant_map()
+
+        index = np.load(path + ".npz")
+        bool_var = np.vectorize(model.GetBoolVarFromProtoIndex, otypes=[object])
+        team_model.assignment = bool_var(index["assignment"])
+        team_model.time_slot = bool_var(index["time_slot"])
+        team_model.team_goodness = np.vectorize(model.GetIntVarFromProtoIndex, otypes=[object])(
+            index["team_goodness"]
+        )
+        team_model.min_goodness = model.GetIntVarFromProtoIndex(int(index["min_goodness"]))
+        team_model.scale = int(index["scale"])
+        return team_model
+
+    def solution(self, value):
+        """the matching and time slots of a solution, value is a Value() function"""
+        return assignment_to_json(value, self.assignment), avalibility_to_json(value, self.time_slot)
+
+
+def model_key(data, options):
+    """
+    hash of everything the model depends on: the model code, the OR-Tools
+    version, the group sizes, the formulation and the data arrays
+    """
+    digest = hashlib.sha256()
+    for code in (TeamModel.__init__, add_availability_constraints, goodness_bounds):
+        digest.update(inspect.getsource(code).encode("utf-8"))
+    digest.update(metadata.version("ortools").encode("utf-8"))
+    digest.update(json.dumps([GRP_SIZ, MIN_WEIGHT, options["availability"]]).encode("utf-8"))
+    for array in (data.np_students, data.np_available, data.coefficients):
+        digest.update(f"{array.shape} {array.dtype}".encode("utf-8"))
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def evict_models(directory=MODEL_CACHE_DIR, max_bytes=MODEL_CACHE_BYTES):
+    # the least recently used models go first
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".pb"):
+            path = os.path.join(directory, name[:-3])
+            size = sum(os.path.getsize(path + s) for s in (".pb", ".npz") if os.path.exists(path + s))
+            entries.append((os.path.getmtime(path + ".pb"), size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        for suffix in (".pb", ".npz"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        total -= size
+
+
+def build_model(data, options, phases, directory=MODEL_CACHE_DIR):
+    """the TeamModel of the dataset, from the model cache when possible"""
+    if not options["model_cache"]:
+        with phases.phase("build"):
+            return TeamModel(data, options)
+
+    path = os.path.join(directory, model_key(data, options))
+    if os.path.exists(path + ".pb"):
+        try:
+            with phases.phase("model_load"):
+                team_model = TeamModel.load(path)
+            os.utime(path + ".pb")
+            phases.size(model_cached=1)
+            return team_model
+        except Exception as e:
+            print(f"model cache: {path} not usable ({e}), rebuilding", file=sys.stderr)
+
+    with phases.phase("build"):
+        team_model = TeamModel(data, options)
+    with phases.phase("model_save"):
+        os.makedirs(directory, exist_ok=True)
+        team_model.save(path)
+        evict_models(directory)
+    phases.size(model_cached=0)
+    return team_model
+
+
+def add_previous_solution_hint(team_model, data, previous):
+    """
+    hints the model with a previous solution, returns the number of students
+    that could be matched to the current data by EID
+    """
+    student_idx = {str(eid): i for i, eid in enumerate(data.student_eids)}
+    team_idx = {str(name): t for t, name in enumerate(data.project_ids)}
+    slot_idx = {time: j for j, time in enumerate(AVA_LST)}
+
+    prev_students = payload_column(previous.get("students", []), "eid")
+    prev_projects = payload_column(previous.get("projects", []), "name")
+
+    hinted = 0
+    for prev_t, members in previous.get("matching", {}).items():
+        t = team_idx.get(str(prev_projects[int(prev_t)]))
+
+        for prev_i in members:
+            i = student_idx.get(str(prev_students[prev_i]))
+            if i is None:
+                continue
+
+            # a known student is hinted in his old team and out of all others
+            for other in range(data.n_teams):
+                team_model.model.AddHint(team_model.assignment[i, other], other == t)
+            hinted += 1
+
+    for prev_t, time in previous.get("time_slot", {}).items():
+        t = team_idx.get(str(prev_projects[int(prev_t)]))
+        if t is None or time not in slot_idx:
+            continue
+        for j in range(len(AVA_LST)):
+            team_model.model.AddHint(team_model.time_slot[t, j], j == slot_idx[time])
+
+    return hinted
+
+
+def solution_indices(data, solution):
+    """
+    the index in data of every student and project of a solution (out.json),
+    matched by EID and Project_ID, -1 for the ones no longer in the data
+    """
+    student_idx = {str(eid): i for i, eid in enumerate(data.student_eids)}
+    team_idx = {str(name): t for t, name in enumerate(data.project_ids)}
+    students = [
+        student_idx.get(str(eid), -1) for eid in payload_column(solution.get("students", []), "eid")
+    ]
+    teams = [
+        team_idx.get(str(name), -1) for name in payload_column(solution.get("projects", []), "name")
+    ]
+    return np.array(students, dtype=int), np.array(teams, dtype=int)
+
+
+def solution_matrix(data, solution):
+    """
+    (x, slots) of a solution (out.json) in the current data, whether it is
+    feasible or not (slot -1 for a team without one), None when it refers to
+    students, projects or slots that are not there
+    """
+    students, teams = solution_indices(data, solution)
+    slot_idx = {time: j for j, time in enumerate(AVA_LST)}
+    x = np.zeros((data.n_students, data.n_teams), dtype=int)
+    slots = np.full(data.n_teams, -1)
+
+    try:
+        for prev_t, members in solution.get("matching", {}).items():
+            t = teams[int(prev_t)]
+            for prev_i in members:
+                if students[prev_i] < 0 or t < 0:
+                    return None
+                x[students[prev_i], t] = 1
+        for prev_t, time in solution.get("time_slot", {}).items():
+            if teams[int(prev_t)] < 0:
+                return None
+            slots[teams[int(prev_t)]] = slot_idx[time]
+    except (KeyError, IndexError, ValueError):
+        return None
+    return x, slots
+
+
+def previous_solution_matrix(data, previous):
+    """
+    the previous solution as (x, slots) when it is still a feasible solution
+    of the current data (same students, every team with a time slot, sizes
+    and availability respected), None otherwise
+    """
+    matrix = solution_matrix(data, previous)
+    if matrix is None:
+        return None
+    x, slots = matrix
+
+    size = x.sum(axis=0)
+    if (
+        (x.sum(axis=1) != 1).any()
+        or (slots < 0).any()
+        or (size < GRP_SIZ["min"]).any()
+        or (size > GRP_SIZ["max"]).any()
+        or (x * (data.np_available[:, slots] == 0)).any()
+    ):
+        return None
+    return x, slots
+
+
+def add_hint(team_model, x, slots):
+    """hints the model with a 0/1 assignment matrix and a slot index per team"""
+    for (i, t), value in np.ndenumerate(x):
+        team_model.model.AddHint(team_model.assignment[i, t], int(value))
+    for t, slot in enumerate(slots):
+        for j in range(team_model.time_slot.shape[1]):
+            team_model.model.AddHint(team_model.time_slot[t, j], j == slot)
+
+
+def solution_to_json(x, slots):
+    """the matching and time slots of a 0/1 assignment matrix, like the callback"""
+    return (
+        {t: np.flatnonzero(x[:, t]).tolist() for t in range(x.shape[1])},
+        {t: AVA_LST[slot] for t, slot in enumerate(slots)},
+    )
 
-    model.AddMinEquality(team_goodness[t], sum_skill)
 
-min_goodness = model.NewIntVar(0, 1000000, "min_goodness")
+def payload_column(entries, key):
+    """one field of every student or project, in either payload layout"""
+    if isinstance(entries, dict):
+        return entries.get(key, [])
+    return [entry[key] for entry in entries]
 
-model.AddMinEquality(min_goodness, team_goodness)
 
-# this is the place of defining the big objective function
-# Objective: maximize the minimum team goodness.
-# as tested this could speed up the solver and 
-# give better result for minimum team goodness
-# compared to just maximizing the minimum team goodness
-model.Maximize(sum(team_goodness) + 1000000 * min_goodness)
+def load_previous_solution(path=OUTPUT_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except ValueError:
+        return None
 
 
 # from assignment directly to json
 def assignment_to_json(val, assignment):
-    
+    n_students, n_teams = assignment.shape
+
     team_assignments = {}
     for t in range(n_teams):
         team_assignments[t] = [
@@ -184,23 +668,179 @@ def assignment_to_json(val, assignment):
 
 def avalibility_to_json(val, time_slot):
     team_availabilities = {}
-    for t in range(n_teams):
+    for t in range(time_slot.shape[0]):
         for i, time in enumerate(AVA_LST):
             if val(time_slot[t, i]) == 1:
                 team_availabilities[t] = time
     return team_availabilities
 
 
+def solver_profiles():
+    """
+    the CP-SAT parameter profiles of config.json and the name of the default
+    one, read on every solve so a profile saved by tune.py is used right away
+    """
+    with open(CONFIG_FILE) as f:
+        section = json.load(f).get("solver", {})
+    return section.get("profiles", {"default": {}}), section.get("profile", "default")
+
+
+def apply_profile(solver, profile):
+    """sets the CP-SAT parameters of a profile (see the profile option)"""
+    if not isinstance(profile, dict):
+        profiles, default = solver_profiles()
+        name = profile or default
+        if name not in profiles:
+            raise ValueError(f"unknown solver profile {name!r}, choose from {sorted(profiles)}")
+        profile = profiles[name]
+
+    fields = solver.parameters.DESCRIPTOR.fields_by_name
+    for key, value in profile.items():
+        if key not in fields:
+            raise ValueError(f"unknown CP-SAT parameter {key!r}")
+        if isinstance(value, list):
+            getattr(solver.parameters, key)[:] = value
+        else:
+            setattr(solver.parameters, key, value)
+
+
+# the stop reasons of the options, the others are optimal, infeasible,
+# cancelled and finished
+STOP_RULES = ("time_limit", "gap", "plateau")
+
+
+def relative_gap(objective, bound):
+    # as CP-SAT's relative_gap_limit
+    return abs(bound - objective) / max(abs(objective), 1)
+
+
+class SolveLimits:
+    """
+    the stop rules of a solve (options time_limit, gap and plateau). The
+    gap is checked on every solution and bound improvement, a watcher thread
+    checks the time budget and the plateau; the rule that stopped the
+    search is kept in reason. stopped is set on a stop or a cancel, the
+    multi step modes end on it
+    """
+
+    def __init__(self, options, cancelled=None):
+        self.started = time.monotonic()
+        self.time_limit = options.get("time_limit")
+        self.gap = options.get("gap")
+        self.plateau = options.get("plateau")
+        self.cancelled = cancelled
+        self.stopped = threading.Event()
+        self.reason = None
+        self.improved = self.started
+        self.objective = None
+        # off in the first phase of the lexicographic mode, a gap there
+        # only ends the phase
+        self.final_phase = True
+        self.solver = None
+        # the last CP-SAT time limit was the rest of the budget
+        self.budget_bound = False
+
+    def remaining(self):
+        """seconds left of the time budget, None without one"""
+        if self.time_limit is None:
+            return None
+        return self.time_limit - (time.monotonic() - self.started)
+
+    def time_for(self, seconds=None):
+        """
+        the time limit of a CP-SAT call with a limit of seconds (None for
+        none) within the budget, None without either
+        """
+        remaining = self.remaining()
+        self.budget_bound = remaining is not None and (seconds is None or remaining <= seconds)
+        if remaining is None:
+            return seconds
+        return max(remaining if seconds is None else min(seconds, remaining), 0.001)
+
+    def improvement(self):
+        self.improved = time.monotonic()
+
+    def stop(self, reason):
+        if self.reason is None:
+            self.reason = reason
+        self.stopped.set()
+        if self.solver is not None:
+            self.solver.StopSearch()
+
+    def check_gap(self, bound):
+        if self.gap is None or self.objective is None:
+            return
+        if relative_gap(self.objective, bound) <= self.gap:
+            if self.final_phase:
+                self.stop("gap")
+            elif self.solver is not None:
+                self.solver.StopSearch()
+
+    def solution(self, objective, bound):
+        # a new solution of the CP-SAT search, the published solution it
+        # started from may still be the better one
+        self.objective = objective if self.objective is None else max(self.objective, objective)
+        self.check_gap(bound)
+
+    def watch(self, solver):
+        """
+        checks the time budget, the plateau and the cancel while the solve
+        runs, the multi step modes only see a cancel through stopped
+        """
+        self.solver = solver
+        if self.time_limit is None and self.plateau is None and self.cancelled is None:
+            return
+        self.improved = time.monotonic()
+
+        def run():
+            while not self.stopped.wait(0.05):
+                if self.cancelled is not None and self.cancelled.is_set():
+                    self.stopped.set()
+                elif self.time_limit is not None and self.remaining() <= 0:
+                    self.stop("time_limit")
+                elif self.plateau is not None and time.monotonic() - self.improved >= self.plateau:
+                    self.stop("plateau")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def close(self, status):
+        """the reason the solve ended"""
+        self.stopped.set()
+        if self.reason is None:
+            if status in ("OPTIMAL", "INFEASIBLE"):
+                self.reason = status.lower()
+            elif self.cancelled is not None and self.cancelled.is_set():
+                self.reason = "cancelled"
+            elif self.time_limit is not None and (self.remaining() <= 0.1 or self.budget_bound):
+                # CP-SAT ran into max_time_in_seconds first, it often stops
+                # up to a second early while still in presolve
+                self.reason = "time_limit"
+            else:
+                self.reason = "finished"
+        return self.reason
+
+
 class TeamFormationCallback(cp_model.CpSolverSolutionCallback):
 
-    def __init__(self, assignment, time_slot):
+    def __init__(self, team_model, publish, limits=None):
         cp_model.CpSolverSolutionCallback.__init__(self)
-        self.assignment = assignment
-        self.time_slot = time_slot
+        self.team_model = team_model
+        self.publish = publish
+        self.limits = limits
         self.best_obj = None
 
+    def weighted_objective(self):
+        # the objective of the weighted mode, whatever the model maximizes,
+        # in the unit of objective_value()
+        return self.team_model.scale * (
+            sum(self.Value(g) for g in self.team_model.team_goodness)
+            + MIN_WEIGHT * self.Value(self.team_model.min_goodness)
+        )
+
     def on_solution_callback(self):
-        cur_obj = self.ObjectiveValue()
+        if self.limits is not None:
+            self.limits.solution(self.ObjectiveValue(), self.BestObjectiveBound())
+        cur_obj = self.weighted_objective()
 
         if self.best_obj is not None and cur_obj <= self.best_obj:
             return
@@ -208,47 +848,342 @@ class TeamFormationCallback(cp_model.CpSolverSolutionCallback):
         # if self.best_obj is None or cur_obj > self.best_obj:
         self.best_obj = cur_obj
 
-        parsed_assignment = assignment_to_json(self.Value, self.assignment)
-        parsed_time_slot = avalibility_to_json(self.Value, self.time_slot)
-
-        output = {
-            "students": students,
-            "projects": projects,
-            "skills": skill_num_to_name,
-            "matching": parsed_assignment,
-            "time_slot": parsed_time_slot,
-        }
-
-        # output to stdout
-        print(json.dumps(output))
-        
-
-
-        # print(cur_obj)
-
-        # output to files
-        with open(OUTPUT_PATH, "w") as file:
-            json.dump(output, file, ensure_ascii=False, indent=2)
-
-        with open(OUTPUT_CSV, "w", newline="") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["Team", "Meet time", "Student Names"])
-            for t, s in parsed_assignment.items():
-                team_name = projects[t]["name"]
-                team_time = parsed_time_slot[t]
-                student_names = [students[i]["name"] for i in s]
-                writer.writerow([team_name, team_time, *student_names])
-
-
-# Solve the model.
-solver = cp_model.CpSolver()
-solver.parameters.log_search_progress = False
-solver.log_callback = print
-
-# comment out max_time to run for arbitrary time
-# solver.parameters.max_time_in_seconds = 60 * 5
-solver.parameters.num_search_workers = max(os.cpu_count() - 1, 1)
+        self.publish(*self.team_model.solution(self.Value))
+
+
+def solve_lexicographic(team_model, solver, callback=None, options=None, cancelled=None,
+                        limits=None, initial_goodness=None):
+    """
+    maximizes min_goodness, then sum(team_goodness) with min_goodness at
+    least the best value of the first phase, hinted with its solution.
+    initial_goodness is the model team_goodness of an already published
+    solution, the second phase starts from it when the first one finds
+    nothing. returns the status name, OPTIMAL only when both phases are proved
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    model = team_model.model
+    time_limit = solver.parameters.max_time_in_seconds
+
+    model.Maximize(team_model.min_goodness)
+    if options["min_time"] is not None:
+        solver.parameters.max_time_in_seconds = min(options["min_time"], time_limit)
+    if limits is not None:
+        limits.final_phase = False
+        if initial_goodness is not None:
+            limits.objective = int(initial_goodness.min())
+        limit = limits.time_for(options["min_time"])
+        if limit is not None:
+            solver.parameters.max_time_in_seconds = limit
+    first = solver.Solve(model, callback)
+    if cancelled and cancelled.is_set():
+        return solver.StatusName(first)
+    if first in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        best_min = solver.Value(team_model.min_goodness)
+        best_total = sum(solver.Value(g) for g in team_model.team_goodness)
+        solution = list(solver.ResponseProto().solution)
+        model.ClearHints()
+        model.Proto().solution_hint.vars.extend(range(len(solution)))
+        model.Proto().solution_hint.values.extend(solution)
+    elif first == cp_model.UNKNOWN and initial_goodness is not None:
+        # nothing within min_time, the model keeps the hint of the
+        # published solution and the rest of the budget goes to the total
+        best_min, best_total = int(initial_goodness.min()), int(initial_goodness.sum())
+    else:
+        return solver.StatusName(first)
+    model.Add(team_model.min_goodness >= best_min)
 
-solution_callback = TeamFormationCallback(assignment=assignment, time_slot=time_slot)
+    model.Maximize(sum(team_model.team_goodness))
+    solver.parameters.max_time_in_seconds = (
+        time_limit if options["total_time"] is None else min(options["total_time"], time_limit)
+    )
+    if limits is not None:
+        # the gap of the second phase counts from the solution it starts from
+        limits.final_phase, limits.objective = True, best_total
+        limit = limits.time_for(options["total_time"])
+        if limit is not None:
+            solver.parameters.max_time_in_seconds = limit
+    second = solver.Solve(model, callback)
+    if second == cp_model.OPTIMAL and first == cp_model.OPTIMAL:
+        return "OPTIMAL"
+    # the first phase (or the published) solution is still a solution
+    return "FEASIBLE"
+
+
+def csv_rows(output):
+    rows = [["Team", "Meet time", "Student Names"]]
+    team_names = payload_column(output["projects"], "name")
+    names = payload_column(output["students"], "name")
+    for t, s in output["matching"].items():
+        team_name = team_names[int(t)]
+        team_time = output["time_slot"][t]
+        student_names = [names[i] for i in s]
+        rows.append([team_name, team_time, *student_names])
+    return rows
+
+
+def solve(data, options=None, solver=None, cancelled=None, workspace=BASE_DIR, phases=None,
+          limits=None):
+    """
+    solves the dataset, streaming every improving solution to stdout and
+    out.json / out.csv in workspace, returns the CP-SAT status name
+
+    a solver can be passed in to be able to StopSearch() from another
+    thread, cancelled (a threading.Event) stops the multi step modes,
+    the time spent in each step is added to phases (metrics.Phases),
+    limits (SolveLimits of the options by default) tells the stop reason
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    phases = phases or metrics.Phases()
+    limits = limits or SolveLimits(options, cancelled)
+    solver = solver or cp_model.CpSolver()
+    output_path = os.path.join(workspace, "out.json")
+
+    # re-optimizing always starts from the previous solution
+    previous = (
+        load_previous_solution(output_path)
+        if options["warm_start"] or options["mode"] == "reoptimize" else None
+    )
 
-status = solver.SolveWithSolutionCallback(model, callback=solution_callback)
+    # kept when re-optimizing, it stays the solution if that fails
+    if os.path.exists(output_path) and options["mode"] != "reoptimize":
+        os.remove(output_path)
+
+    students, projects = data.payload(options["payload"])
+    emitter = stream.SolutionEmitter(students, projects, data.skill_num_to_name)
+    emitter.header()
+
+    result_writer = writer.ResultWriter(output_path, os.path.join(workspace, "out.csv"), csv_rows)
+
+    def publish(matching, time_slot):
+        limits.improvement()
+        with phases.phase("publish"):
+            # output to stdout, only the teams that changed
+            emitter.emit(matching, time_slot)
+
+            # output to files, on the writer thread
+            result_writer.submit({
+                "students": students,
+                "projects": projects,
+                "skills": data.skill_num_to_name,
+                "matching": matching,
+                "time_slot": time_slot,
+            })
+
+    try:
+        if options["mode"] == "reoptimize":
+            import reoptimize
+            limits.watch(solver)
+            status_name = reoptimize.solve(
+                data, previous, options, publish, solver=solver, phases=phases, limits=limits
+            )
+            limits.close(status_name)
+            return status_name
+
+        # the previous solution is shown right away when it still fits the
+        # data, the heuristic one otherwise
+        initial = previous_solution_matrix(data, previous) if previous is not None else None
+        if initial is None and options["heuristic"]:
+            import heuristic
+            with phases.phase("heuristic"):
+                initial = heuristic.solve(data, options["heuristic_time"])
+        if initial is not None:
+            publish(*solution_to_json(*initial))
+
+        if options["mode"] == "decompose":
+            import decompose
+            limits.watch(solver)
+            status_name = decompose.solve(
+                data, options, publish, solver=solver, cancelled=limits.stopped, initial=initial,
+                phases=phases, limits=limits,
+            )
+            if status_name == "CANCELLED" and limits.reason is not None:
+                # ended by a stop rule, not by the user
+                status_name = "UNKNOWN"
+            if status_name == "UNKNOWN" and result_writer.submitted:
+                status_name = "FEASIBLE"
+            limits.close(status_name)
+            return status_name
+
+        import compress
+        compressed = options["compress"] == "always" or (
+            options["compress"] == "auto" and compress.worth_compressing(data)
+        )
+        if compressed:
+            # small enough to be built every time, not cached
+            with phases.phase("build"):
+                team_model = compress.CompressedModel(data, options)
+            phases.size(classes=len(team_model.members))
+        else:
+            team_model = build_model(data, options, phases)
+        phases.size(
+            variables=len(team_model.model.Proto().variables),
+            constraints=len(team_model.model.Proto().constraints),
+        )
+        print(
+            (f"model (compressed, {phases.sizes['classes']} student classes): " if compressed
+             else f"model ({options['availability']} availability): ")
+            + f"{phases.sizes['variables']} variables, "
+            f"{phases.sizes['constraints']} constraints"
+            + (" (cached)" if phases.sizes.get("model_cached") else ""),
+            file=sys.stderr,
+        )
+
+        if compressed:
+            # the classes are hinted with the counts of the initial solution,
+            # the previous one when it still fits
+            if initial is not None:
+                team_model.hint(*initial)
+        elif previous is not None:
+            hinted = add_previous_solution_hint(team_model, data, previous)
+            print(f"warm start: {hinted} of {data.n_students} students hinted", file=sys.stderr)
+        elif initial is not None:
+            add_hint(team_model, *initial)
+
+        # Solve the model.
+        solve_started = time.perf_counter()
+        presolved = []
+
+        def log(line):
+            # the presolved model is logged once presolve is done
+            if not presolved and line.startswith("Presolved"):
+                presolved.append(time.perf_counter() - solve_started)
+
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = log
+
+        # no time limit unless the request sets one, see SolveLimits
+        time_limit = limits.time_for()
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        solver.best_bound_callback = limits.check_gap
+        apply_profile(solver, options["profile"])
+        # the number of workers is not part of a profile
+        solver.parameters.num_search_workers = options["num_workers"] or max(os.cpu_count() - 1, 1)
+
+        if previous is not None:
+            # the old solution may violate the new data (a late student makes a
+            # team too big), let CP-SAT repair it instead of dropping the hint
+            solver.parameters.repair_hint = True
+
+        solution_callback = TeamFormationCallback(team_model, publish, limits)
+        if initial is not None:
+            # only publish CP-SAT solutions better than the one already shown
+            solution_callback.best_obj = objective_value(data, initial[0])
+
+        initial_goodness = None
+        if initial is not None:
+            # in model units, the gap counts from the published solution
+            # until CP-SAT finds a better one
+            initial_goodness = team_goodness_values(data, initial[0]) // team_model.scale
+            limits.objective = int(initial_goodness.sum() + MIN_WEIGHT * initial_goodness.min())
+
+        limits.watch(solver)
+        if limits.stopped.is_set():
+            # the budget went into loading and building
+            status_name = "FEASIBLE" if result_writer.submitted else "UNKNOWN"
+        elif options["objective"] == "lexicographic":
+            status_name = solve_lexicographic(
+                team_model, solver, solution_callback, options, limits.stopped, limits,
+                initial_goodness=initial_goodness,
+            )
+        else:
+            status_name = solver.StatusName(
+                solver.SolveWithSolutionCallback(team_model.model, callback=solution_callback)
+            )
+        limits.close(status_name)
+        if status_name == "UNKNOWN" and result_writer.submitted:
+            # CP-SAT found nothing better than the published solution
+            status_name = "FEASIBLE"
+
+        elapsed = time.perf_counter() - solve_started
+        presolve = presolved[0] if presolved else elapsed
+        phases.add("presolve", presolve)
+        phases.add("search", elapsed - presolve)
+        return status_name
+
+    finally:
+        result_writer.close()
+        phases.add("write", result_writer.write_seconds)
+        phases.size(
+            solutions=result_writer.submitted,
+            writes=result_writer.written,
+            bytes_written=result_writer.bytes_written,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--availability",
+        choices=["aggregated", "pairwise", "full"],
+        default=DEFAULT_OPTIONS["availability"],
+        help="formulation of the time slot availability constraints",
+    )
+    parser.add_argument("--num-workers", type=int, default=None, help="CP-SAT search workers")
+    parser.add_argument(
+        "--warm-start", action="store_true", help="hint the search with the previous out.json"
+    )
+    parser.add_argument(
+        "--mode", choices=["monolithic", "decompose"], default=DEFAULT_OPTIONS["mode"],
+        help="solve the cohort as one model or in parallel pieces",
+    )
+    parser.add_argument(
+        "--no-heuristic", action="store_true", help="do not start from the greedy solution"
+    )
+    parser.add_argument(
+        "--no-model-cache", action="store_true", help="build the model even if it is cached"
+    )
+    parser.add_argument(
+        "--compress", choices=["auto", "always", "never"], default=DEFAULT_OPTIONS["compress"],
+        help="model identical students as classes with a count per team",
+    )
+    parser.add_argument(
+        "--objective", choices=["weighted", "lexicographic"], default=DEFAULT_OPTIONS["objective"],
+        help="one weighted objective or min goodness first, then the total",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=None, help="seconds for the min goodness phase"
+    )
+    parser.add_argument(
+        "--total-time", type=float, default=None, help="seconds for the total goodness phase"
+    )
+    parser.add_argument(
+        "--payload", choices=["rows", "columns"], default=DEFAULT_OPTIONS["payload"],
+        help="layout of the students and projects in the output",
+    )
+    parser.add_argument(
+        "--profile", default=None, help="CP-SAT parameter profile of config.json"
+    )
+    parser.add_argument(
+        "--time-limit", type=float, default=None, help="wall clock seconds of the whole solve"
+    )
+    parser.add_argument(
+        "--gap", type=float, default=None, help="stop at this relative gap to the best bound"
+    )
+    parser.add_argument(
+        "--plateau", type=float, default=None,
+        help="stop after this many seconds without a better solution",
+    )
+    args = parser.parse_args()
+
+    options = {
+        "heuristic": not args.no_heuristic,
+        "model_cache": not args.no_model_cache,
+        "compress": args.compress,
+        "objective": args.objective,
+        "min_time": args.min_time,
+        "total_time": args.total_time,
+        "payload": args.payload,
+        "time_limit": args.time_limit,
+        "gap": args.gap,
+        "plateau": args.plateau,
+        "profile": args.profile,
+        "availability": args.availability,
+        "num_workers": args.num_workers,
+        "warm_start": args.warm_start,
+        "mode": args.mode,
+    }
+    limits = SolveLimits(options)
+    status = solve(load_data(), options, limits=limits)
+    print(f"{status}, stopped by: {limits.reason}", file=sys.stderr)
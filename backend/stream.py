@@ -0,0 +1,120 @@
+import json
+import sys
+from collections import deque
+
+# Solution stream protocol, the solver prints one json record per line:
+#
+#   {"type": "header", "seq": 0, "students": [...], "projects": [...], "skills": {...}}
+#   {"type": "delta", "seq": 1, "matching": {"0": [3, 5, 8]}, "time_slot": {"0": "MW 1:30-3:00"}}
+#   {"type": "delta", "seq": 2, "matching": {"4": [1, 2, 9]}, "time_slot": {}}
+#
+# the header holds the static data once per solve, every delta only carries
+# the teams whose members or time slot changed since the previous record.
+# The server folds the records into a SolutionState and hands late joining
+# clients a full {"type": "snapshot", ...} record built from it.
+
+
+class SolutionEmitter:
+    """solver side, turns every improving solution into a delta record"""
+
+    def __init__(self, students, projects, skills, out=None):
+        self.students = students
+        self.projects = projects
+        self.skills = skills
+        self.out = out or sys.stdout
+        self.seq = 0
+        self.matching = {}
+        self.time_slot = {}
+
+    def _print(self, record):
+        print(json.dumps(record), file=self.out, flush=True)
+
+    def header(self):
+        self._print({
+            "type": "header",
+            "seq": self.seq,
+            "students": self.students,
+            "projects": self.projects,
+            "skills": self.skills,
+        })
+
+    def emit(self, matching, time_slot=None):
+        matching = {str(t): list(s) for t, s in matching.items()}
+        time_slot = {str(t): s for t, s in (time_slot or {}).items()}
+
+        changed_matching = {
+            t: s for t, s in matching.items() if self.matching.get(t) != s
+        }
+        changed_time_slot = {
+            t: s for t, s in time_slot.items() if self.time_slot.get(t) != s
+        }
+
+        self.matching = matching
+        self.time_slot = time_slot
+        self.seq += 1
+
+        self._print({
+            "type": "delta",
+            "seq": self.seq,
+            "matching": changed_matching,
+            "time_slot": changed_time_slot,
+        })
+
+
+class SolutionState:
+    """server side, the current solution rebuilt from the stream records"""
+
+    def __init__(self, history=256):
+        self.history = history
+        self.generation = 0
+        self.reset()
+
+    def reset(self):
+        # a new generation means a new solve, clients following the old
+        # one have to start over from a snapshot
+        self.generation += 1
+        self.header = None
+        self.seq = 0
+        self.matching = {}
+        self.time_slot = {}
+        self.deltas = deque(maxlen=self.history)
+
+    def apply(self, record):
+        kind = record.get("type")
+
+        if kind == "header":
+            self.reset()
+            self.header = {k: record[k] for k in ("students", "projects", "skills")}
+        elif kind == "snapshot":
+            self.reset()
+            self.header = {k: record[k] for k in ("students", "projects", "skills")}
+            self.matching = dict(record.get("matching", {}))
+            self.time_slot = dict(record.get("time_slot", {}))
+            self.seq = record.get("seq", 0)
+        elif kind == "delta":
+            self.matching.update(record["matching"])
+            self.time_slot.update(record["time_slot"])
+            self.seq = record["seq"]
+            self.deltas.append(record)
+
+    def snapshot(self):
+        return {
+            "type": "snapshot",
+            "seq": self.seq,
+            **(self.header or {"students": [], "projects": [], "skills": {}}),
+            "matching": self.matching,
+            "time_slot": self.time_slot,
+        }
+
+    def since(self, generation, seq):
+        """
+        the delta records a client that has seen up to seq is missing, None
+        when they are no longer buffered and the client needs a snapshot
+        """
+        if generation != self.generation:
+            return None
+        if seq == self.seq:
+            return []
+        if seq > self.seq or not self.deltas or self.deltas[0]["seq"] > seq + 1:
+            return None
+        return [d for d in self.deltas if d["seq"] > seq]
@@ -0,0 +1,182 @@
+"""
+Offline tuning of the CP-SAT parameter profiles (config.json solver.profiles).
+
+    python backend/tune.py --sizes 100x20,200x40 --time-limit 30 --grid --save tuned
+
+Every candidate profile solves every instance (generated cohorts of --sizes
+and the cohort directories of --instances, a directory with config.json and
+files/ like the ones of generate.py, "." for the uploaded files) in a fresh
+process with the benchmark runner of solver2 (see benchmark.py). The best
+known objective of an instance is the best one any candidate reached, a run
+scores the time to reach --target of it (loading and building included),
+twice the time limit when it never did. The candidates are ranked by the
+mean score, the winner is saved to config.json as the --save profile and
+made the default one (solver.profile). The output file holds every run.
+
+candidates: the profiles of config.json, with --grid also every combination
+of linearization_level (0, 1, 2) and symmetry_level (0, 2, 4).
+"""
+import argparse
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import benchmark
+import generate
+
+CONFIG_FILE = "config.json"
+
+GRID = {
+    "linearization_level": [0, 1, 2],
+    "symmetry_level": [0, 2, 4],
+}
+
+
+def candidates(grid=False):
+    """name -> CP-SAT parameters"""
+    with open(CONFIG_FILE) as f:
+        profiles = dict(json.load(f).get("solver", {}).get("profiles", {"default": {}}))
+    if grid:
+        for values in itertools.product(*GRID.values()):
+            params = dict(zip(GRID, values))
+            name = "_".join(f"{k.split('_')[0]}{v}" for k, v in params.items())
+            profiles.setdefault(name, params)
+    return profiles
+
+
+def time_to_target(trace, best, target, time_limit):
+    """seconds until the trace reached target * best, 2 * time_limit if never"""
+    for seconds, objective, _ in trace:
+        if objective >= target * best:
+            return seconds
+    return 2 * time_limit
+
+
+def run(directory, params, time_limit, num_workers):
+    # one solve in its own process, the config of the cohort is read on import
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    options = {"num_workers": num_workers, "heuristic": False, "profile": params}
+    proc = context.Process(
+        target=benchmark.run_case, args=(directory, "solver2", options, time_limit, results)
+    )
+    proc.start()
+    try:
+        result = results.get(timeout=time_limit * 2 + 120)
+    except queue.Empty:
+        result = {"status": "NO_RESULT", "trace": []}
+        proc.kill()
+    proc.join()
+    return result
+
+
+def rank(runs, instances, names, target, time_limit):
+    """[(name, mean score, instances reached)] best first"""
+    best = {}
+    for instance in instances:
+        values = [p[1] for r in runs if r["instance"] == instance for p in r["trace"]]
+        best[instance] = max(values) if values else None
+
+    ranking = []
+    for name in names:
+        scores = []
+        for r in runs:
+            if r["profile"] != name or best[r["instance"]] is None:
+                continue
+            r["score"] = time_to_target(r["trace"], best[r["instance"]], target, time_limit)
+            scores.append(r["score"])
+        reached = sum(s < 2 * time_limit for s in scores)
+        ranking.append((name, sum(scores) / len(scores) if scores else None, reached))
+    return sorted(ranking, key=lambda r: (r[1] is None, r[1]))
+
+
+def save_profile(name, params):
+    with open(CONFIG_FILE) as f:
+        config = json.load(f)
+    section = config.setdefault("solver", {})
+    section.setdefault("profiles", {})[name] = params
+    section["profile"] = name
+    with open(CONFIG_FILE, "w") as f:
+        json.dump(config, f, indent=4)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=benchmark.parse_sizes, default=[],
+        help="generated cohorts as students x projects, comma separated",
+    )
+    parser.add_argument(
+        "--instances", default="", help="cohort directories (config.json and files/), comma separated"
+    )
+    parser.add_argument("--profiles", default=None, help="candidates to run, all by default")
+    parser.add_argument("--grid", action="store_true", help="also the parameter grid")
+    parser.add_argument("--time-limit", type=float, default=30, help="seconds per run")
+    parser.add_argument("--target", type=float, default=0.99, help="fraction of the best objective")
+    parser.add_argument("--num-workers", type=int, default=None, help="CP-SAT search workers")
+    parser.add_argument("--save", default=None, help="save the winner as this profile")
+    parser.add_argument("--output", default="tune.json")
+    generate.add_arguments(parser)
+    args = parser.parse_args()
+
+    profiles = candidates(args.grid)
+    if args.profiles:
+        unknown = [p for p in args.profiles.split(",") if p not in profiles]
+        if unknown:
+            parser.error(f"unknown profiles {unknown}, choose from {sorted(profiles)}")
+        profiles = {p: profiles[p] for p in args.profiles.split(",")}
+    instances = [os.path.abspath(d) for d in args.instances.split(",") if d]
+    if not args.sizes and not instances:
+        parser.error("give --sizes or --instances")
+
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="tune_") as tmp:
+        for n_students, n_projects in args.sizes:
+            directory = os.path.join(tmp, f"{n_students}x{n_projects}")
+            generate.write_cohort(directory, *generate.generate(
+                n_students, n_projects, args.skills, args.slots, args.student_ratings,
+                args.company_ratings, args.availability, args.seed,
+            ))
+            instances.append(directory)
+
+        print(f"{'instance':>24} {'profile':>16} {'status':>10} {'first':>6} {'best objective':>16}")
+        for directory in instances:
+            for name, params in profiles.items():
+                result = run(directory, params, args.time_limit, args.num_workers)
+                result.update(instance=directory, profile=name, params=params)
+                runs.append(result)
+                best = max((p[1] for p in result["trace"]), default=None)
+                print(
+                    f"{os.path.basename(directory)[-24:]:>24} {name:>16} {result['status']:>10} "
+                    f"{benchmark.format_seconds(result.get('first_solution')):>6} "
+                    f"{'-' if best is None else best:>16}",
+                    flush=True,
+                )
+
+    ranking = rank(runs, instances, list(profiles), args.target, args.time_limit)
+    print(f"\ntime to {args.target:.0%} of the best known objective "
+          f"({2 * args.time_limit:g}s when not reached)")
+    for name, score, reached in ranking:
+        print(f"{name:>16} {benchmark.format_seconds(score):>8}s  "
+              f"reached on {reached} of {len(instances)}")
+
+    report = {
+        "commit": benchmark.git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "settings": {"time_limit": args.time_limit, "target": args.target,
+                     "num_workers": args.num_workers},
+        "ranking": [{"profile": n, "score": s, "reached": r} for n, s, r in ranking],
+        "runs": runs,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    winner = ranking[0][0] if ranking and ranking[0][1] is not None else None
+    if args.save and winner is not None:
+        save_profile(args.save, profiles[winner])
+        print(f"{winner} saved as profile {args.save!r} in {CONFIG_FILE}")
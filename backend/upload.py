@@ -0,0 +1,332 @@
+"""
+Streaming upload of the input files (POST /file/upload, multipart/form-data
+with a "filearg" file and a "file_type" field).
+
+The body is parsed as it arrives (MultipartParser): the file is written to a
+temp file in the workspace and its csv rows are checked on the way
+(CsvChecker: required columns, row width, ratings in the mapping, same rules
+as verifier.py). Upload.finish() renames the temp file into place once the
+body is complete and the file has no errors, so a solve never reads a half
+written or invalid file. The cross file checks (same skills in both files)
+stay in the verification of the solve.
+
+Upload.feed() does blocking file IO, the server runs it in an executor.
+"""
+import codecs
+import csv
+import operator
+import os
+import re
+import tempfile
+import numpy as np
+import verifier
+
+# form fields other than the file are small
+MAX_FIELD_BYTES = 1024
+
+FILE_TYPES = {
+    "Company": (verifier.COMPANY_INFO_COLUMNS, verifier.COM_MAP),
+    "Student": (verifier.STUDENT_INFO_COLUMNS, verifier.STU_MAP),
+}
+
+
+def multipart_boundary(content_type):
+    """the boundary of a multipart/form-data Content-Type, None otherwise"""
+    if not content_type.startswith("multipart/form-data"):
+        return None
+    match = re.search(r'boundary=("?)([^";]+)\1', content_type)
+    return match.group(2).encode("latin-1") if match else None
+
+
+class MultipartParser:
+    """
+    incremental multipart/form-data parser, calls
+    on_part(headers) / on_data(bytes) / on_part_end() for every part
+    """
+
+    def __init__(self, boundary, on_part, on_data, on_part_end):
+        self.delimiter = b"\r\n--" + boundary
+        self.on_part = on_part
+        self.on_data = on_data
+        self.on_part_end = on_part_end
+        # the preamble is read as if it followed a line break
+        self.buffer = b"\r\n"
+        self.state = "preamble"
+
+    def feed(self, data):
+        self.buffer += data
+        while True:
+            if self.state == "preamble":
+                at = self.buffer.find(self.delimiter)
+                if at < 0:
+                    self.buffer = self.buffer[-len(self.delimiter):]
+                    return
+                self.buffer = self.buffer[at + len(self.delimiter):]
+                self.state = "after_delimiter"
+
+            elif self.state == "after_delimiter":
+                if len(self.buffer) < 2:
+                    return
+                if self.buffer.startswith(b"--"):
+                    self.state = "done"
+                    return
+                self.buffer = self.buffer[2:]
+                self.state = "headers"
+
+            elif self.state == "headers":
+                at = self.buffer.find(b"\r\n\r\n")
+                if at < 0:
+                    if len(self.buffer) > 16384:
+                        raise ValueError("multipart part headers too long")
+                    return
+                self.on_part(self.buffer[:at].decode("utf-8", errors="replace"))
+                self.buffer = self.buffer[at + 4:]
+                self.state = "body"
+
+            elif self.state == "body":
+                at = self.buffer.find(self.delimiter)
+                if at < 0:
+                    # the end may hold the start of the delimiter
+                    keep = len(self.delimiter) - 1
+                    if len(self.buffer) > keep:
+                        self.on_data(self.buffer[:-keep])
+                        self.buffer = self.buffer[-keep:]
+                    return
+                self.on_data(self.buffer[:at])
+                self.on_part_end()
+                self.buffer = self.buffer[at + len(self.delimiter):]
+                self.state = "after_delimiter"
+
+            else:
+                return
+
+    @property
+    def complete(self):
+        return self.state == "done"
+
+
+def part_disposition(headers):
+    """(name, filename) of the Content-Disposition of a part"""
+    name = re.search(r'\bname="([^"]*)"', headers)
+    filename = re.search(r'\bfilename="([^"]*)"', headers)
+    return (name.group(1) if name else None), (filename.group(1) if filename else None)
+
+
+class CsvChecker:
+    """
+    checks a csv file while it arrives, the kind of file (Company or
+    Student) is told by its header, errors go to a verifier.ErrorReport
+    """
+
+    def __init__(self, report):
+        self.report = report
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.pending = ""
+        self.record = ""
+        self.kind = None
+        self.header = None
+        self.rows = 0
+        self.binary = False
+
+    def feed(self, data, final=False):
+        if self.binary:
+            return
+        try:
+            text = self.pending + self.decoder.decode(data, final)
+        except UnicodeDecodeError:
+            self.report.add(self.kind, "not_utf8", "The file is not a UTF-8 text file")
+            self.binary = True
+            return
+
+        lines = text.split("\n")
+        self.pending = "" if final else lines.pop()
+        if final:
+            lines.append("")
+        if not self.record and '"' not in text:
+            # no quoted fields, every line is a record
+            records = [line for line in lines if line.strip()]
+        else:
+            records = []
+            for line in lines:
+                self.record += line + "\n"
+                # a quoted field goes on over the line break
+                if self.record.count('"') % 2 and not final:
+                    continue
+                if self.record.strip():
+                    records.append(self.record.rstrip("\r\n"))
+                self.record = ""
+        self.check(list(csv.reader(records)))
+
+    def check(self, rows):
+        """checks a batch of parsed rows, the header first"""
+        if rows and self.header is None:
+            self.check_header(rows.pop(0))
+        if self.kind is None:
+            return
+
+        for fields in rows:
+            row = self.rows
+            self.rows += 1
+            if self.report.full:
+                continue
+            # the usual spelling of every rating, the rest is checked cell by cell
+            if len(fields) == len(self.header) and self.plain_ratings.issuperset(
+                self.rating_values(fields)
+            ) and all(fields[col].strip() for col in self.required):
+                continue
+            self.check_row(row, fields)
+
+    def check_row(self, row, fields):
+        if len(fields) != len(self.header):
+            self.report.add(self.kind, "row_width",
+                            f"Error: {self.kind} - row index {row} has {len(fields)} values, "
+                            f"the header has {len(self.header)}", row=row)
+            return
+
+        for col in self.required:
+            if not fields[col].strip():
+                self.report.add(self.kind, "empty_value",
+                                f"{self.header[col]} cannot be empty at row {row}",
+                                row=row, column=self.header[col])
+
+        low, high = min(self.mapping), max(self.mapping)
+        for col in self.ratings:
+            value = fields[col]
+            if value in self.plain_ratings:
+                continue
+            try:
+                rating = float(value)
+            except ValueError:
+                self.report.add(self.kind, "not_numeric",
+                                f"Error: {self.kind} - value {value} at row index {row} in column "
+                                f"'{self.header[col]}' is not numeric",
+                                row=row, column=self.header[col], value=value)
+                continue
+            if not np.isfinite(rating) or int(rating) not in self.mapping:
+                self.report.add(self.kind, "out_of_range",
+                                f"Error: {self.kind} - value {value} at row index {row} in column "
+                                f"'{self.header[col]}' must be between {low} and {high}",
+                                row=row, column=self.header[col], value=value)
+
+    def check_header(self, fields):
+        self.header = fields
+        if "Project_ID" in fields:
+            self.kind = "Company"
+        elif "EID" in fields:
+            self.kind = "Student"
+        else:
+            self.report.add(None, "unknown_header",
+                            "The header has neither a Project_ID (Company) nor an EID (Student) column")
+            return
+
+        info_columns, self.mapping = FILE_TYPES[self.kind]
+        for column in info_columns:
+            if column not in fields:
+                self.report.add(self.kind, "missing_column", f"Missing required column: {column}",
+                                column=column)
+        self.ratings = [i for i, c in enumerate(fields) if c not in info_columns]
+        self.plain_ratings = {str(rating) for rating in self.mapping}
+        self.rating_values = lambda fields: (fields[i] for i in self.ratings)
+        if len(self.ratings) > 1:
+            self.rating_values = operator.itemgetter(*self.ratings)
+        # empty cells are only reported for the company info, like verifier.py
+        self.required = [
+            i for i, c in enumerate(fields) if self.kind == "Company" and c in info_columns
+        ]
+
+    def finish(self):
+        self.feed(b"", final=True)
+        if self.header is None:
+            self.report.add(self.kind, "empty_file", "The file is empty")
+
+
+class Upload:
+    """one upload request into a workspace"""
+
+    def __init__(self, workspace, boundary, max_errors=verifier.MAX_ERR):
+        self.workspace = workspace
+        self.report = verifier.ErrorReport(max_errors)
+        self.parser = MultipartParser(boundary, self.on_part, self.on_data, self.on_part_end)
+        self.fields = {}
+        self.part = None
+        self.filename = None
+        self.file = None
+        self.tmp_path = None
+        self.checker = None
+        self.bytes = 0
+        self.broken = False
+
+    def on_part(self, headers):
+        self.part, filename = part_disposition(headers)
+        if self.part == "filearg":
+            if self.tmp_path is not None:
+                raise ValueError("only one file per upload")
+            self.filename = filename or ""
+            fd, self.tmp_path = tempfile.mkstemp(dir=self.workspace, prefix=".upload_")
+            self.file = os.fdopen(fd, "wb")
+            self.checker = CsvChecker(self.report)
+        else:
+            self.fields[self.part] = b""
+
+    def on_data(self, data):
+        if self.part == "filearg":
+            self.file.write(data)
+            self.bytes += len(data)
+            self.checker.feed(data)
+        elif self.part is not None:
+            self.fields[self.part] += data
+            if len(self.fields[self.part]) > MAX_FIELD_BYTES:
+                raise ValueError(f"form field {self.part} too long")
+
+    def on_part_end(self):
+        if self.part == "filearg":
+            self.file.close()
+            self.checker.finish()
+        self.part = None
+
+    def feed(self, data):
+        if self.broken:
+            return
+        try:
+            self.parser.feed(data)
+        except ValueError as e:
+            # the rest of the body is ignored
+            self.report.add(None, "bad_request", str(e))
+            self.broken = True
+
+    def check_form(self, file_type):
+        if not self.parser.complete or self.tmp_path is None:
+            self.report.add(None, "incomplete_upload", "The upload has no complete file")
+        elif file_type not in FILE_TYPES:
+            self.report.add(None, "unknown_file_type", f"Unknown file_type: {file_type!r}")
+        elif self.checker.kind not in (None, file_type):
+            self.report.add(file_type, "wrong_file_type",
+                            f"The file was uploaded as {file_type} but looks like a {self.checker.kind} file")
+
+    def finish(self):
+        """
+        the name the file was stored under and the errors, the file is only
+        renamed into place when there are none
+        """
+        file_type = self.fields.get("file_type", b"").decode("utf-8", errors="replace")
+        if not self.broken:
+            self.check_form(file_type)
+
+        errors = self.report.result()
+        name = file_type + os.path.splitext(self.filename or "")[1]
+        if errors:
+            self.discard()
+            return name, errors
+
+        os.chmod(self.tmp_path, 0o644)
+        os.replace(self.tmp_path, os.path.join(self.workspace, name))
+        self.tmp_path = None
+        return name, errors
+
+    def discard(self):
+        # the request ended early or the file is not valid
+        if self.file is not None:
+            self.file.close()
+        if self.tmp_path is not None and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        self.tmp_path = None
@@ -1,5 +1,7 @@
 import pandas as pd
+import numpy as np
 import json
+import metrics
 
 # Here we assumed that the config file is fomatted correctly
 
@@ -11,10 +13,63 @@ with open(CONFIG_FILE) as f:
     COM_MAP = config["company_mapping"]
     IMP_MAP = config["skill_importance"]
     AVA_LST = config["time_avaliability"]
+    MAX_ERR = config.get("verifier", {}).get("max_errors", 100)
 
 STU_MAP = {int(k): v for k, v in STU_MAP.items()}
 COM_MAP = {int(k): v for k, v in COM_MAP.items()}
 
+COMPANY_INFO_COLUMNS = ['Project_ID', 'Company', 'Project_Title']
+STUDENT_INFO_COLUMNS = ['EID', 'Name'] + AVA_LST
+
+
+class ErrorReport:
+    """
+    Collects structured verification errors and stops accepting new ones once
+    the cap is reached. Every error is a plain dict so the list can be dumped
+    to json as is:
+
+        {"file": "Student", "row": 3, "column": "FPGA", "code": "out_of_range",
+         "value": "7", "msg": "..."}
+
+    row is the 0-based data row (the header is not counted), row and column
+    are None for errors that concern the whole file.
+    """
+
+    def __init__(self, max_errors=MAX_ERR):
+        self.max_errors = max_errors
+        self.errors = []
+        self.truncated = False
+
+    @property
+    def full(self):
+        return self.max_errors is not None and len(self.errors) >= self.max_errors
+
+    def add(self, file, code, msg, row=None, column=None, value=None):
+        if self.full:
+            self.truncated = True
+            return
+        self.errors.append({
+            "file": file,
+            "row": None if row is None else int(row),
+            "column": column,
+            "code": code,
+            "value": None if value is None else str(value),
+            "msg": msg,
+        })
+
+    def result(self):
+        if self.truncated:
+            return self.errors + [{
+                "file": None,
+                "row": None,
+                "column": None,
+                "code": "too_many_errors",
+                "value": None,
+                "msg": f"Stopped after {self.max_errors} errors",
+            }]
+        return self.errors
+
+
 def load_csv(file_path):
     try:
         return pd.read_csv(file_path)
@@ -22,158 +77,167 @@ def load_csv(file_path):
         print(f"Error loading CSV file: {e}")
         return f"Invalid path: {file_path}"
 
-def check_company_required_columms(company_csv):
-    errors = []
-    required_columns = ['Project_ID', 'Company', 'Project_Title']
-    for column in required_columns:
-        if column not in company_csv.columns:
-            errors.append(f"Missing required column: {column}")
-    
-    if 'Project_ID' in company_csv.columns:
-        for i, val in enumerate(company_csv['Project_ID']):
-            if val is None or val == '':
-                errors.append(f"Project_ID cannot be empty at row {i}")
-
-    if 'Company' in company_csv.columns:
-        for i, val in enumerate(company_csv['Company']):
-            if val is None or val == '':
-                errors.append(f"Company cannot be empty at row {i}")
-
-    if 'Project_Title' in company_csv.columns:
-        for i, val in enumerate(company_csv['Project_Title']):
-            if val is None or val == '':
-                errors.append(f"Project_Title cannot be empty at row {i}")
-    if errors:
-        return ",".join(errors)
-
-def check_student_required_columms(student_csv):
-    errors = []
-    required_columns = ['EID', 'Name'] + AVA_LST
-    for column in required_columns:
-        if column not in student_csv.columns:
-            errors.append(f"Missing required column: {column}")
-    if errors:
-        return ",".join(errors)
-
-def check_shape(company_df, student_df):
-    errors = []
-    # Drop non-skill columns from copies to avoid modifying the original DataFrames
-    # company_df_copy = company_df.copy()
-    # student_df_copy = student_df.copy()
-    
-    for col in ['Project_ID', 'Company', 'Project_Title']:
-        if col in company_df.columns:
-            company_df.drop(col, axis=1, inplace=True)
-    for col in ['EID', 'Name'] + AVA_LST:
-        if col in student_df.columns:
-            student_df.drop(col, axis=1, inplace=True)
-    
-    if company_df.shape[1] != student_df.shape[1]:
-        errors.append("The number of skills in the company and student files do not match")
-    if errors:
-        return ",".join(errors)
-
-def check_skills(company_df, student_df):
-    errors = []
-    company_skills = list(company_df.columns)
-    student_skills = list(student_df.columns)
-
-    print(f"Company skills: {company_skills}")
-    print(f"Student skills: {student_skills}")
-    
+
+def _empty_mask(series):
+    # pandas reads empty cells as NaN, whitespace only cells stay strings
+    return series.isna().to_numpy() | (series.astype(str).str.strip() == "").to_numpy()
+
+
+def check_company_required_columms(company_df, report):
+    for column in COMPANY_INFO_COLUMNS:
+        if column not in company_df.columns:
+            report.add("Company", "missing_column", f"Missing required column: {column}", column=column)
+            continue
+
+        for idx in np.flatnonzero(_empty_mask(company_df[column])):
+            report.add("Company", "empty_value", f"{column} cannot be empty at row {idx}",
+                       row=idx, column=column)
+            if report.truncated:
+                return
+
+
+def check_student_required_columms(student_df, report):
+    for column in STUDENT_INFO_COLUMNS:
+        if column not in student_df.columns:
+            report.add("Student", "missing_column", f"Missing required column: {column}", column=column)
+
+
+def skill_columns(company_df, student_df):
+    # the skill columns are everything that is not an info column, the frames
+    # themselves are left untouched
+    company_skills = [c for c in company_df.columns if c not in COMPANY_INFO_COLUMNS]
+    student_skills = [c for c in student_df.columns if c not in STUDENT_INFO_COLUMNS]
+    return company_skills, student_skills
+
+
+def check_shape(company_skills, student_skills, report):
+    if len(company_skills) != len(student_skills):
+        report.add("Company", "skill_count_mismatch",
+                   "The number of skills in the company and student files do not match")
+
+
+def check_values(df, columns, mapping, file, report):
+    """
+    validate a whole block of rating columns at once, a value is accepted
+    when int(value) is a key of the mapping (same rule as the solver uses)
+    """
+    if not columns or report.truncated:
+        return
+
+    values = df[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    not_numeric = np.isnan(values)
+    out_of_range = ~not_numeric & ~np.isin(np.trunc(values), list(mapping.keys()))
+    bad = not_numeric | out_of_range
+
+    if not bad.any():
+        return
+
+    low, high = min(mapping.keys()), max(mapping.keys())
+
+    # report column by column like the file is read by a person
+    for col_idx, idx in np.argwhere(bad.T):
+        if report.truncated:
+            return
+        col = columns[col_idx]
+        val = df[col].iat[idx]
+        if not_numeric[idx, col_idx]:
+            report.add(file, "not_numeric",
+                       f"Error: {file} - value {val} at row index {idx} in column '{col}' is not numeric",
+                       row=idx, column=col, value=val)
+        else:
+            report.add(file, "out_of_range",
+                       f"Error: {file} - value {val} at row index {idx} in column '{col}' must be between {low} and {high}",
+                       row=idx, column=col, value=val)
+
+
+def check_skills(company_df, student_df, company_skills, student_skills, report):
     if company_skills != student_skills:
-        errors.append("The skills in the company file and student file do not match")
-    
+        report.add("Company", "skill_name_mismatch",
+                   "The skills in the company file and student file do not match")
+
     for mapped_skill in IMP_MAP.keys():
         if mapped_skill not in company_skills:
-            errors.append(f"Skill '{mapped_skill}' is not present in the company file")
+            report.add("Company", "missing_weighted_skill",
+                       f"Skill '{mapped_skill}' is not present in the company file", column=mapped_skill)
         if mapped_skill not in student_skills:
-            errors.append(f"Skill '{mapped_skill}' is not present in the student file")
-
-    # Check company values with position details.
-    # for col in company_skills:
-    #     for idx, val in company_df[col].items():
-    #         # Check numeric type
-    #         if type(val) != int:
-    #             errors.append(f"Error: Company - value {val} at row index {idx} in column '{col}' must be numeric")
-    #         # Check value range
-    #         elif val < 1 or val > 5:
-    #             errors.append(f"Error: Company - value {val} at row index {idx} in column '{col}' must be between 1 and 5")
-    
-    # # Check student values with position details.
-    # for col in student_skills:
-    #     for idx, val in student_df[col].items():
-    #         if type(val) != int:
-    #             errors.append(f"Error: Student - value {val} at row index {idx} in column '{col}' must be numeric")
-    #         elif val < 1 or val > 5:
-    #             errors.append(f"Error: Student - value {val} at row index {idx} in column '{col}' must be between 1 and 5")
-    # Check company values with position details.
-    for col in company_skills:
-        for idx, val in company_df[col].items():
-            try:
-                numeric_val = int(val)                    
-                if numeric_val not in COM_MAP.keys():
-                    errors.append(f"Error: Company - value {val} at row index {idx} in column '{col}' must be between 1 and 5")
-            except Exception:
-                errors.append(f"Error: Company - value {val} at row index {idx} in column '{col}' is not numeric")
-    
-    # Check student values with position details.
-    for col in student_skills:
-        for idx, val in student_df[col].items():
-            try:
-                numeric_val = int(val)
-                if numeric_val not in STU_MAP.keys():
-                    errors.append(f"Error: Student - value {val} at row index {idx} in column '{col}' must be between 1 and 5")
-            except Exception:
-                errors.append(f"Error: Student - value {val} at row index {idx} in column '{col}' is not numeric")
-    
-    if errors:
-        return ",".join(errors)
-
-def check_time(student_df):
-    errors = []
-
-    for idx, row in student_df.iterrows():
-        # one student has to have at least one avalible time
-        if (row[AVA_LST] == 0).all():
-            errors.append(f"Error: Student - EID {row['EID']} has no available time slots")
-    
-    if errors:
-        return ",".join(errors)
-
-def verifier(company_csv, student_csv):
-    errors = []
-    
-    company_df = load_csv(company_csv)
-    student_df = load_csv(student_csv)
-    
+            report.add("Student", "missing_weighted_skill",
+                       f"Skill '{mapped_skill}' is not present in the student file", column=mapped_skill)
+
+    check_values(company_df, company_skills, COM_MAP, "Company", report)
+    check_values(student_df, student_skills, STU_MAP, "Student", report)
+
+
+def check_time(student_df, report):
+    # missing time columns are already reported by the required column check
+    if any(column not in student_df.columns for column in AVA_LST):
+        return
+
+    available = student_df[AVA_LST].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+    # one student has to have at least one avalible time
+    for idx in np.flatnonzero((available == 0).all(axis=1)):
+        eid = student_df["EID"].iat[idx] if "EID" in student_df.columns else idx
+        report.add("Student", "no_available_time",
+                   f"Error: Student - EID {eid} has no available time slots",
+                   row=idx, value=eid)
+        if report.truncated:
+            return
+
+
+def verify_frames(company_df, student_df, max_errors=MAX_ERR):
+    report = ErrorReport(max_errors)
+
+    check_company_required_columms(company_df, report)
+    check_student_required_columms(student_df, report)
+    check_time(student_df, report)
+
+    company_skills, student_skills = skill_columns(company_df, student_df)
+    check_shape(company_skills, student_skills, report)
+    check_skills(company_df, student_df, company_skills, student_skills, report)
+
+    return report.result()
+
+
+def read_and_verify(company_csv, student_csv, max_errors=MAX_ERR, phases=None):
+    """
+    (errors, company_df, student_df), the frames are None when a file can
+    not be read, the timings go to phases (metrics.Phases)
+    """
+    report = ErrorReport(max_errors)
+    phases = phases or metrics.Phases()
+
+    with phases.phase("verify_read"):
+        company_df = load_csv(company_csv)
+        student_df = load_csv(student_csv)
+
     if isinstance(company_df, str):
-        errors.append(company_df)
+        report.add("Company", "unreadable_file", company_df)
+        company_df = None
     if isinstance(student_df, str):
-        errors.append(student_df)
-    
-    if errors:
-        return ",".join(errors)
-    
-    errors.append(check_company_required_columms(company_df))
-    errors.append(check_student_required_columms(student_df))
-    errors.append(check_time(student_df))
-    errors.append(check_shape(company_df, student_df))
-    errors.append(check_skills(company_df, student_df))
-    
-    #return ",".join(filter(None, errors)) if errors else "Success"
-    errors = list(filter(None, errors))
-    if errors:
-        return ",".join(errors)
-    else:
-        return "Success"
+        report.add("Student", "unreadable_file", student_df)
+        student_df = None
+
+    if report.errors:
+        return report.result(), company_df, student_df
+
+    phases.size(verified_rows=len(company_df) + len(student_df))
+    with phases.phase("verify_checks"):
+        return verify_frames(company_df, student_df, max_errors), company_df, student_df
+
+
+def verifier(company_csv, student_csv, max_errors=MAX_ERR, phases=None):
+    """
+    returns the list of verification errors, an empty list means the files
+    can be handed to the solver, the timings go to phases (metrics.Phases)
+    """
+    return read_and_verify(company_csv, student_csv, max_errors, phases)[0]
 
 # if __name__ == "__main__":
 #     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 #     FILES_DIR = os.path.join(BASE_DIR, "example_file")
-    
+
 #     company_csv_path = os.path.join(FILES_DIR, "Company.csv")
 #     student_csv_path = os.path.join(FILES_DIR, "Student.csv")
-    
+
 #     result = verifier(company_csv_path, student_csv_path)
-#     print(result)
\ No newline at end of file
+#     print(result)
@@ -0,0 +1,131 @@
+"""
+Long lived solver process, started together with the server (backend/main.py)
+so pandas, NumPy, OR-Tools and the config are only imported once, and the
+parsed input files are kept until they change on disk.
+
+Commands arrive as one json object per line on stdin:
+
+    {"cmd": "solve", "options": {"availability": "aggregated", ...}, "workspace": "files/"}
+    {"cmd": "cancel"}
+
+the workspace holds Company.csv and Student.csv and receives out.json and
+out.csv, it defaults to files/.
+
+every solve answers on stdout with the solution stream (see stream.py)
+followed by {"type": "done", "status": "OPTIMAL", "stop_reason": "optimal",
+"metrics": {...}, ...}, stop_reason is the rule that ended the search (see
+solver2.SolveLimits), metrics holds the duration and sizes of every phase (see metrics.py).
+Logs go to stderr.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from ortools.sat.python import cp_model
+import solver2
+import metrics
+
+
+class Worker:
+
+    def __init__(self):
+        self.data = None
+        self.data_key = None
+        self.solver = None
+        self.thread = None
+        self.cancelled = threading.Event()
+
+    @property
+    def busy(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def load(self, comp_path, stud_path, phases):
+        # re-parse only when other files are asked for or one was replaced
+        key = tuple(
+            (p, os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in (comp_path, stud_path)
+        )
+        if key != self.data_key:
+            self.data = solver2.load_data(comp_path, stud_path, phases)
+            self.data_key = key
+        else:
+            phases.size(
+                students=self.data.n_students, teams=self.data.n_teams, skills=self.data.n_skills
+            )
+        return self.data
+
+    def run(self, options, workspace):
+        started = time.perf_counter()
+        result = {"type": "done"}
+        phases = metrics.Phases()
+        # the time budget counts from the request, loading included
+        limits = solver2.SolveLimits(options, self.cancelled)
+
+        try:
+            data = self.load(
+                os.path.join(workspace, "Company.csv"), os.path.join(workspace, "Student.csv"),
+                phases,
+            )
+            if self.cancelled.is_set():
+                result["status"] = "CANCELLED"
+            else:
+                result["status"] = solver2.solve(
+                    data, options, solver=self.solver, cancelled=self.cancelled,
+                    workspace=workspace, phases=phases, limits=limits,
+                )
+            result["stop_reason"] = limits.close(result["status"])
+        except Exception as e:
+            traceback.print_exc()
+            result.update(status="ERROR", msg=str(e))
+        finally:
+            # ends the watcher thread of SolveLimits, a failed solve skips close()
+            limits.stopped.set()
+
+        result["wall_time"] = time.perf_counter() - started
+        result["metrics"] = phases.summary()
+        print(json.dumps(result), flush=True)
+
+    def stop(self):
+        # StopSearch() is a no-op until the search has started, so keep
+        # asking until the solve thread is gone
+        while self.busy:
+            self.solver.StopSearch()
+            time.sleep(0.1)
+
+    def handle(self, command):
+        cmd = command.get("cmd")
+
+        if cmd == "solve":
+            if self.busy:
+                print(json.dumps({"type": "error", "msg": "worker is busy"}), flush=True)
+                return
+            self.cancelled.clear()
+            self.solver = cp_model.CpSolver()
+            self.thread = threading.Thread(
+                target=self.run,
+                args=(command.get("options") or {}, command.get("workspace") or solver2.BASE_DIR),
+                daemon=True,
+            )
+            self.thread.start()
+
+        elif cmd == "cancel":
+            self.cancelled.set()
+            threading.Thread(target=self.stop, daemon=True).start()
+
+        else:
+            print(f"unknown command: {command}", file=sys.stderr)
+
+    def serve(self):
+        # the server closing our stdin is the signal to exit
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            try:
+                self.handle(json.loads(line))
+            except ValueError:
+                print(f"invalid command: {line!r}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    Worker().serve()
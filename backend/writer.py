@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def atomic_write(path, write, newline=None):
+    """
+    write(file) into a temp file next to path and rename it into place, so
+    readers see either the old or the new file, never a half written one
+    """
+    directory = os.path.dirname(path) or "."
+    # mkstemp creates the file private, keep the mode of the file it replaces
+    mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w", newline=newline, encoding="utf-8") as file:
+            write(file)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class ResultWriter:
+    """
+    Persists solver results on a background thread so the CP-SAT callback
+    never waits on the disk. Only the most recent submitted solution is
+    written, the ones arriving while a write is in progress replace each
+    other (they are counted as coalesced).
+
+    csv_rows(output) returns the rows of the csv file, header included.
+    """
+
+    def __init__(self, json_path, csv_path, csv_rows):
+        self.json_path = json_path
+        self.csv_path = csv_path
+        self.csv_rows = csv_rows
+
+        self.submitted = 0
+        self.written = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+
+        self._latest = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def coalesced(self):
+        return self.submitted - self.written
+
+    def submit(self, output):
+        with self._cond:
+            self._latest = output
+            self.submitted += 1
+            self._cond.notify()
+
+    def close(self):
+        # waits for the last submitted solution to be on disk
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+        print(
+            f"result writer: {self.submitted} solutions, {self.written} written, "
+            f"{self.coalesced} coalesced",
+            file=sys.stderr,
+        )
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._latest is None and not self._closed:
+                    self._cond.wait()
+                output, self._latest = self._latest, None
+                if output is None:
+                    return
+
+            started = time.perf_counter()
+            self._write(output)
+            self.write_seconds += time.perf_counter() - started
+            self.written += 1
+            self.bytes_written += sum(
+                os.path.getsize(path) for path in (self.json_path, self.csv_path)
+            )
+
+    def _write(self, output):
+        atomic_write(
+            self.json_path,
+            lambda file: json.dump(output, file, ensure_ascii=False),
+        )
+        atomic_write(
+            self.csv_path,
+            lambda file: csv.writer(file).writerows(self.csv_rows(output)),
+            newline="",
+        )
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useRef } from 'react'; // Added useRef
+import React, { useState, useEffect } from 'react';
 import './App.css';
 import { use } from 'react';
 
@@ -17,6 +17,27 @@ function getLowestSatScore(project, studentIndices, matchingData) {
   return satScores.length > 0 ? Math.min(...satScores) : 0;
 }
 
+// Stream records (/matching lines or /events data): a snapshot (or header)
+// with the full data, followed by deltas carrying only the changed teams.
+function applyStreamRecords(text, current) {
+  let data = current;
+  text.split('\n').filter(line => line.trim()).forEach(line => {
+    const record = JSON.parse(line);
+    if (record.type === 'delta') {
+      if (!data) return;
+      data = {
+        ...data,
+        seq: record.seq,
+        matching: { ...data.matching, ...record.matching },
+        time_slot: { ...(data.time_slot || {}), ...record.time_slot }
+      };
+    } else {
+      data = { matching: {}, time_slot: {}, ...record };
+    }
+  });
+  return data;
+}
+
 function TeamDetails({ project, studentIndices, matchingData }) {
   // Gather allocated students from indices
   const allocatedStudents = studentIndices.map(idx => matchingData.students[idx]);
@@ -107,71 +128,36 @@ function App() {
     company: false
   });
 
+  // Live solution updates pushed by the server (Server-Sent Events): a
+  // snapshot on connect and for every new solve, then the changed teams.
   useEffect(() => {
-    fetchMatchingData();
-  }, []);
+    const source = new EventSource('http://localhost:8888/events');
+    source.addEventListener('snapshot', (event) => {
+      setMatchingData(applyStreamRecords(event.data, null));
+    });
+    source.addEventListener('delta', (event) => {
+      setMatchingData(current => applyStreamRecords(event.data, current));
+    });
+    source.addEventListener('status', (event) => {
+      const job = JSON.parse(event.data);
+      if (job.status === 'queued' || job.status === 'running') {
+        setSolverStatus('Solver running...');
+      } else if (job.status === 'finished') {
+        setSolverStatus('Matching complete!');
+      } else if (job.status === 'cancelled') {
+        setSolverStatus('Solver Stopped');
+      } else if (job.status === 'failed') {
+        setSolverStatus('Solver failed. Please try again.');
+      }
+    });
+    source.onerror = (error) => {
+      // EventSource reconnects by itself
+      console.error('Error in matching event stream:', error);
+    };
 
-  // Polling for updated match results
-  useEffect(() => {
-    fetchMatchData();
+    return () => source.close();
   }, []);
 
-  // Global ref for the matching poll interval (if needed)
-  const pollMatchIntervalRef = useRef(null);
-  // Global ref for the solver polling interval
-  const solverPollingIntervalRef = useRef(null);
-
-  // useEffect(() => {
-  //   pollMatchIntervalRef.current = setInterval(async () => {
-  //     try {
-  //       const response = await fetch('http://localhost:8888/match');
-  //       const data = await response.json();
-  //       if (data && Object.keys(data).length > 0) {
-  //         setMatchingData(data);
-  //       }
-  //     } catch (err) {
-  //       console.error('Error fetching match data:', err);
-  //     }
-  //   }, 2000);
-
-  //   return () => clearInterval(pollMatchIntervalRef.current);
-  // }, []);
-
-  const fetchMatchData = async () => {
-    try {
-      const response = await fetch('http://localhost:8888/match');
-      const data = await response.json();
-      if (data && Object.keys(data).length > 0) {
-        setMatchingData(data);
-      }
-    } catch (err) {
-      console.error('Error fetching match data:', err);
-    }
-  };
-    
-  const fetchMatchingData = async () => {
-    try {
-      const response = await fetch('http://localhost:8888/matching', {
-        method: 'POST'
-      });
-      const text = await response.text();
-      console.log('Received raw data:', text);
-      try {
-        const data = JSON.parse(text);
-        console.log('Parsed matching data:', data);
-        if (data && Object.keys(data).length > 0) {
-          setMatchingData(data);
-        }
-      } catch (parseError) {
-        console.error('Error parsing JSON:', parseError);
-        setMatchingData(null);
-      }
-    } catch (error) {
-      console.error('Error fetching matching data:', error);
-      setMatchingData(null);
-    }
-  };
-
   const handleFileUpload = async (event) => {
     event.preventDefault();
     setIsLoading(true);
@@ -183,6 +169,15 @@ function App() {
         method: 'POST',
         body: formData
       });
+      if (!response.ok) {
+        const result = await response.json();
+        setUploadStatus(result.msg);
+        setFilesUploaded(prev => ({
+          ...prev,
+          [fileType.toLowerCase()]: false
+        }));
+        return;
+      }
       const result = await response.text();
       setUploadStatus(result);
       setFilesUploaded(prev => ({
@@ -208,48 +203,6 @@ function App() {
 
       if (solverResult.result === 'success') {
         setSolverStatus('Solver running...');
-        let attempts = 0;
-        const maxAttempts = 15;
-        pollMatchIntervalRef.current = setInterval(fetchMatchData, 2000);
-        solverPollingIntervalRef.current = setInterval(async () => {
-          try {
-            console.log('Polling for results...');
-            const response = await fetch('http://localhost:8888/matching', {
-              method: 'POST'
-            });
-            const text = await response.text();
-            console.log('Received raw polling data:', text);
-            try {
-              const data = JSON.parse(text);
-              console.log('Parsed polling data:', data);
-              if (data && data.matching && Object.keys(data.matching).length > 0) {
-                console.log('Found matching results:', data.matching);
-                setMatchingData(data);
-                setSolverStatus('Matching complete!');
-              } else {
-                attempts++;
-                if (attempts >= maxAttempts) {
-                  clearInterval(solverPollingIntervalRef.current);
-                  setSolverStatus('Solver timed out. Please try again.');
-                }
-              }
-            } catch (parseError) {
-              console.error('Error parsing JSON:', parseError);
-              attempts++;
-              if (attempts >= maxAttempts) {
-                clearInterval(solverPollingIntervalRef.current);
-                setSolverStatus('Invalid data received. Please try again.');
-              }
-            }
-          } catch (error) {
-            console.error('Error polling for results:', error);
-            attempts++;
-            if (attempts >= maxAttempts) {
-              clearInterval(solverPollingIntervalRef.current);
-              setSolverStatus('Solver failed. Please try again.');
-            }
-          }
-        }, 2000);
       }
     } catch (error) {
       console.error('Error:', error);
@@ -259,7 +212,7 @@ function App() {
     }
   };
 
-  // Kill function to terminate the solver polling interval
+  // Kill function to stop the running solve
   const handleKill = async () => {
     try {
       const response = await fetch('http://localhost:8888/action/kill', {
@@ -271,17 +224,6 @@ function App() {
       console.error('Error killing backend solver:', error);
       setSolverStatus('Error terminating solver');
     }
-
-    await new Promise(resolve => setTimeout(resolve, 20000));
-
-    if (solverPollingIntervalRef.current) {
-      clearInterval(solverPollingIntervalRef.current);
-      //solverPollingIntervalRef.current = null;
-    }
-    if(pollMatchIntervalRef.current) {
-      clearInterval(pollMatchIntervalRef.current);
-      //pollMatchIntervalRef.current = null;
-    }
   };
 
   const handleDownloadCSV = async () => {